@@ -0,0 +1,41 @@
+"""Бюджеты SQL-запросов представлений.
+
+Бюджет -- наибольшее число запросов, которое представление делает на
+странице любого размера, считая сессию и пользователя и без кеша
+шаблонов. Он объявляется декоратором ``query_budget`` рядом с
+представлением. Тесты сверяют бюджет на страницах из 1 и 10 записей, а
+``core.middleware.QueryBudgetMiddleware`` при DEBUG предупреждает о
+превышении.
+"""
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+
+def query_budget(queries):
+    """Объявляет бюджет представления; ставится поверх остальных
+    декораторов, хотя ``functools.wraps`` переносит его и так."""
+    def decorator(view):
+        view.query_budget = queries
+        return view
+    return decorator
+
+
+def budget_for(view):
+    return getattr(view, 'query_budget', None)
+
+
+@contextmanager
+def count_queries():
+    """Список SQL всех запросов ко всем базам внутри блока."""
+    queries = []
+
+    def execute(run, sql, params, many, context):
+        queries.append(sql)
+        return run(sql, params, many, context)
+
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(
+                connections[alias].execute_wrapper(execute))
+        yield queries
@@ -0,0 +1,51 @@
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY = 'tag:{}'
+
+
+def tags_version(*tags):
+    """Сводная версия набора тегов для ключа кеша.
+
+    Запись, в ключ которой входит эта версия, зависит от всех ``tags``:
+    ``invalidate`` любого из них делает ее недостижимой без
+    ``cache.clear()``. Версии читаются одним запросом к кешу.
+    """
+    return tags_versions([tags])[0]
+
+
+def tags_versions(tag_sets):
+    """Версии нескольких наборов тегов одним запросом к кешу."""
+    tag_sets = [[VERSION_KEY.format(tag) for tag in tags]
+                for tags in tag_sets]
+    keys = list(dict.fromkeys(key for keys in tag_sets for key in keys))
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        initial = _initial_version()
+        for key in missing:
+            cache.add(key, initial, timeout=None)
+        versions.update(cache.get_many(missing))
+        # Кеш мог не сохранить счетчик (DummyCache, недоступный
+        # memcached, вытеснение): тогда запись просто не найдется.
+        for key in missing:
+            versions.setdefault(key, initial)
+    return ['.'.join(str(versions[key]) for key in keys)
+            for keys in tag_sets]
+
+
+def invalidate(*tags):
+    """Сбрасывает все записи, зависящие от любого из ``tags``."""
+    for tag in set(tags):
+        key = VERSION_KEY.format(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_version(), timeout=None)
+
+
+def _initial_version():
+    # Версия не начинается с 1, чтобы после вытеснения счетчика
+    # из кеша не совпасть со старыми, еще живыми записями.
+    return time.time_ns()
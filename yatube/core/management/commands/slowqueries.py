@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.slowlog import slow_log
+
+ROW = '{:>10} {:>6} {:>9} {:>9}  {}'
+SQL_LENGTH = 300
+
+
+class Command(BaseCommand):
+    help = ('Показывает запросы из журнала медленных SQL-запросов с '
+            'наибольшим суммарным временем.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument('--view', help='Только запросы этого адреса.')
+        parser.add_argument('--hours', type=float,
+                            help='Только за последние часы.')
+        parser.add_argument('--plans', action='store_true',
+                            help='Показать планы и параметры.')
+        parser.add_argument('--clear', action='store_true',
+                            help='Очистить журнал.')
+
+    def handle(self, *args, **options):
+        log = slow_log()
+        if options['clear']:
+            log.clear()
+            self.stdout.write(self.style.SUCCESS('Журнал очищен'))
+            return
+        since = (time.time() - options['hours'] * 3600
+                 if options['hours'] else None)
+        offenders = log.top(options['top'], options['view'], since)
+        if not offenders:
+            self.stdout.write('Медленных запросов нет')
+            return
+        self.stdout.write(ROW.format(
+            'всего мс', 'раз', 'сред. мс', 'макс. мс', 'адреса'))
+        for offender in offenders:
+            self.stdout.write(ROW.format(
+                f'{offender.total_ms:.1f}', offender.count,
+                f'{offender.avg_ms:.1f}', f'{offender.max_ms:.1f}',
+                ', '.join(offender.views)))
+            sql = offender.fingerprint
+            if len(sql) > SQL_LENGTH:
+                sql = sql[:SQL_LENGTH] + '...'
+            self.stdout.write(f'    {sql}')
+            if options['plans']:
+                self.stdout.write(f'    параметры: {offender.params}')
+                for line in offender.plan.splitlines():
+                    self.stdout.write(f'      {line}')
@@ -0,0 +1,303 @@
+"""Метрики запросов в текстовом формате Prometheus.
+
+``core.middleware.MetricsMiddleware`` замеряет каждый запрос: задержку,
+число и время SQL-запросов, время рендеринга шаблонов, попадания в кеш
+и размер ответа с разбивкой по имени адреса. Значения копятся в памяти
+процесса и раз в METRICS_FLUSH_SECONDS прибавляются к общему хранилищу
+SQLite (``settings.METRICS_DB``), поэтому ``/metrics`` отдает сумму по
+всем процессам-обработчикам на машине.
+
+Все значения хранятся как счетчики: гистограмма -- это счетчики
+корзин ``le`` и счетчики ``_sum`` и ``_count``.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from collections import defaultdict, namedtuple
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache.backends import locmem
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+from .sidecar import SidecarDB
+
+logger = logging.getLogger('core.metrics')
+
+Metric = namedtuple('Metric', 'type help buckets')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5,
+                   10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+METRICS = {
+    'yatube_http_requests_total': Metric(
+        'counter', 'Запросы по адресу, методу и статусу.', None),
+    'yatube_http_request_duration_seconds': Metric(
+        'histogram', 'Время обработки запроса.', LATENCY_BUCKETS),
+    'yatube_http_response_size_bytes': Metric(
+        'histogram', 'Размер тела ответа.', SIZE_BUCKETS),
+    'yatube_db_queries_total': Metric(
+        'counter', 'SQL-запросы.', None),
+    'yatube_db_query_seconds_total': Metric(
+        'counter', 'Время SQL-запросов.', None),
+    'yatube_template_render_seconds_total': Metric(
+        'counter', 'Время рендеринга шаблонов.', None),
+    'yatube_cache_requests_total': Metric(
+        'counter', 'Чтения ключей кеша: result="hit" или "miss".', None),
+}
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Метка для запросов, не дошедших до представления (404 и т. п.).
+UNRESOLVED = '<unresolved>'
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS samples (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (name, labels)
+)
+'''
+UPSERT = '''
+INSERT INTO samples (name, labels, value) VALUES (?, ?, ?)
+ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value
+'''
+
+
+def format_labels(labels):
+    """``{"a": "1"}`` -> ``a="1"`` с экранированием по формату."""
+    return ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', r'\\').replace(
+            '"', r'\"').replace('\n', r'\n'))
+        for key, value in labels.items())
+
+
+def format_value(value):
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Store(SidecarDB):
+    """Общее для процессов хранилище счетчиков в файле SQLite."""
+
+    schema = SCHEMA
+
+    def add(self, values):
+        """Прибавляет ``{(имя, метки): значение}`` в одной транзакции."""
+        with self.locked() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                connection.executemany(UPSERT, (
+                    (name, labels, value)
+                    for (name, labels), value in values.items()))
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+
+    def samples(self):
+        with self.locked() as connection:
+            return connection.execute(
+                'SELECT name, labels, value FROM samples '
+                'ORDER BY name, labels'
+            ).fetchall()
+
+    def clear(self):
+        with self.locked() as connection:
+            connection.execute('DELETE FROM samples')
+
+
+class Registry:
+    """Накопленные процессом значения, еще не записанные в хранилище."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = defaultdict(float)
+        self.flushed = time.monotonic()
+        self.stores = {}
+
+    def inc(self, name, labels, value=1):
+        key = (name, format_labels(labels))
+        with self.lock:
+            self.pending[key] += value
+
+    def observe(self, name, labels, value):
+        """Наблюдение гистограммы: корзины le, _sum и _count."""
+        with self.lock:
+            # Пустые корзины тоже записываются: в выводе нужны все.
+            for bucket in METRICS[name].buckets + ('+Inf',):
+                key = (f'{name}_bucket',
+                       format_labels({**labels, 'le': bucket}))
+                self.pending[key] += bucket == '+Inf' or value <= bucket
+            self.pending[f'{name}_sum', format_labels(labels)] += value
+            self.pending[f'{name}_count', format_labels(labels)] += 1
+
+    def store(self):
+        path = settings.METRICS_DB
+        if path not in self.stores:
+            self.stores[path] = Store(path)
+        return self.stores[path]
+
+    def flush(self, force=False):
+        """Пишет накопленное в хранилище, если пора или ``force``."""
+        now = time.monotonic()
+        if not force and now - self.flushed < settings.METRICS_FLUSH_SECONDS:
+            return
+        with self.lock:
+            pending, self.pending = self.pending, defaultdict(float)
+            self.flushed = now
+        if not pending:
+            return
+        try:
+            self.store().add(pending)
+        except sqlite3.Error:
+            # Значения не теряются: запишутся со следующим сбросом.
+            with self.lock:
+                for key, value in pending.items():
+                    self.pending[key] += value
+            raise
+
+    def exposition(self):
+        """Все значения хранилища в текстовом формате Prometheus."""
+        self.flush(force=True)
+        series = defaultdict(list)
+        for name, labels, value in self.store().samples():
+            base = name
+            for suffix in ('_bucket', '_sum', '_count'):
+                if name.endswith(suffix) and name[:-len(suffix)] in METRICS:
+                    base = name[:-len(suffix)]
+            series[base].append((name, labels, value))
+        lines = []
+        for base, metric in METRICS.items():
+            lines.append(f'# HELP {base} {metric.help}')
+            lines.append(f'# TYPE {base} {metric.type}')
+            for name, labels, value in sorted(series[base], key=_order):
+                lines.append(f'{name}{{{labels}}} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _order(sample):
+    # Корзины гистограммы -- по возрастанию le, а не как строки.
+    name, labels, _ = sample
+    head, _, le = labels.partition(',le="')
+    return head, name, float(le.rstrip('"')) if le else 0.0
+
+
+registry = Registry()
+_local = threading.local()
+
+
+class RequestStats:
+    """Счетчики одного запроса, которые пополняют обертки ниже."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.render = 0.0
+        self.rendering = 0
+        self.hits = 0
+        self.misses = 0
+
+
+def current():
+    return getattr(_local, 'stats', None)
+
+
+@contextmanager
+def collect():
+    """Собирает RequestStats запросов, шаблонов и кеша внутри блока."""
+    stats = RequestStats()
+
+    def execute(run, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return run(sql, params, many, context)
+        finally:
+            stats.queries += 1
+            stats.sql += time.perf_counter() - started
+
+    previous, _local.stats = current(), stats
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(execute))
+            yield stats
+    finally:
+        _local.stats = previous
+
+
+def record(view, method, status, duration, size, stats):
+    labels = {'view': view}
+    registry.inc('yatube_http_requests_total',
+                 {**labels, 'method': method, 'status': status})
+    registry.observe('yatube_http_request_duration_seconds', labels,
+                     duration)
+    if size is not None:
+        registry.observe('yatube_http_response_size_bytes', labels, size)
+    registry.inc('yatube_db_queries_total', labels, stats.queries)
+    registry.inc('yatube_db_query_seconds_total', labels, stats.sql)
+    registry.inc('yatube_template_render_seconds_total', labels,
+                 stats.render)
+    registry.inc('yatube_cache_requests_total',
+                 {**labels, 'result': 'hit'}, stats.hits)
+    registry.inc('yatube_cache_requests_total',
+                 {**labels, 'result': 'miss'}, stats.misses)
+    try:
+        registry.flush()
+    except sqlite3.Error:
+        logger.exception('Хранилище метрик недоступно')
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        stats = current()
+        if stats is None:
+            return super().render(context, request)
+        # Вложенный render_to_string входит во время внешнего шаблона.
+        stats.rendering += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.rendering -= 1
+            if not stats.rendering:
+                stats.render += time.perf_counter() - started
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Бэкенд шаблонов Django, замеряющий время рендеринга."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+class CacheStatsMixin:
+    """Считает попадания и промахи ``get`` бэкенда кеша.
+
+    ``get_many`` базового класса читает ключи через ``get``, поэтому
+    каждый ключ учитывается отдельно. Для memcached или redis нужен
+    такой же подкласс их бэкенда.
+    """
+
+    _missing = object()
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, self._missing, version)
+        stats = current()
+        if stats is not None:
+            if value is self._missing:
+                stats.misses += 1
+            else:
+                stats.hits += 1
+        return default if value is self._missing else value
+
+
+class LocMemCache(CacheStatsMixin, locmem.LocMemCache):
+    pass
@@ -0,0 +1,92 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import metrics, slowlog
+from .budgets import budget_for, count_queries
+
+logger = logging.getLogger('core.budgets')
+
+QUERY_COUNT_HEADER = 'X-Query-Count'
+
+
+def view_name(request):
+    match = request.resolver_match
+    return match.view_name if match else metrics.UNRESOLVED
+
+
+class QueryBudgetMiddleware:
+    """При DEBUG считает запросы и предупреждает о превышении бюджета.
+
+    Число запросов отдается в заголовке X-Query-Count. Запросы,
+    выполняемые при чтении потокового ответа, не учитываются.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with count_queries() as queries:
+            response = self.get_response(request)
+        response[QUERY_COUNT_HEADER] = len(queries)
+        match = request.resolver_match
+        budget = budget_for(match.func) if match else None
+        if budget is not None and len(queries) > budget:
+            logger.warning(
+                '%s: %d SQL-запросов при бюджете %d\n%s',
+                match.view_name, len(queries), budget, '\n'.join(queries))
+        return response
+
+
+class MetricsMiddleware:
+    """Замеряет запросы для /metrics (см. core.metrics).
+
+    Стоит первым в MIDDLEWARE, чтобы учитывать все остальные слои.
+    Размер потокового ответа учитывается, когда клиент дочитал тело.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with metrics.collect() as stats:
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+        labels = (view_name(request), request.method, response.status_code)
+        if not response.streaming:
+            metrics.record(*labels, duration, len(response.content), stats)
+            return response
+        metrics.record(*labels, duration, None, stats)
+        response.streaming_content = self.stream_size(
+            response.streaming_content, labels[0])
+        return response
+
+    @staticmethod
+    def stream_size(content, view):
+        size = 0
+        for chunk in content:
+            size += len(chunk)
+            yield chunk
+        metrics.registry.observe(
+            'yatube_http_response_size_bytes', {'view': view}, size)
+
+
+class SlowQueryMiddleware:
+    """Пишет SQL-запросы дольше SLOW_QUERY_MS в журнал core.slowlog."""
+
+    def __init__(self, get_response):
+        if settings.SLOW_QUERY_MS is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with slowlog.watch(lambda: view_name(request),
+                           settings.SLOW_QUERY_MS / 1000):
+            return self.get_response(request)
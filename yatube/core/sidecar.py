@@ -0,0 +1,38 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class SidecarDB:
+    """Файл SQLite рядом с основной базой, общий для процессов машины.
+
+    Соединение открывается лениво и заново после fork, схема
+    ``schema`` создается при первом подключении. Потоки процесса делят
+    одно соединение, поэтому работа с ним идет через ``locked``.
+    """
+
+    schema = ''
+
+    def __init__(self, path):
+        self.path = path
+        self.pid = None
+        self.connection = None
+        self.lock = threading.Lock()
+
+    def connect(self):
+        if self.pid != os.getpid():
+            self.connection = sqlite3.connect(
+                self.path, timeout=10, isolation_level=None,
+                check_same_thread=False)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.executescript(self.schema)
+            self.pid = os.getpid()
+        return self.connection
+
+    @contextmanager
+    def locked(self):
+        """Соединение, занятое текущим потоком до конца блока."""
+        with self.lock:
+            yield self.connect()
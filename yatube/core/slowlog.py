@@ -0,0 +1,192 @@
+"""Журнал медленных SQL-запросов.
+
+``core.middleware.SlowQueryMiddleware`` на время HTTP-запроса ставит
+обертку ``execute_wrapper``. Запрос дольше SLOW_QUERY_MS записывается
+в файл SQLite SLOW_QUERY_DB вместе с именем адреса, длительностью,
+параметрами без содержимого строк и планом ``EXPLAIN QUERY PLAN``, а
+также в лог ``core.slowlog``. Команда ``slowqueries`` показывает
+запросы с наибольшим суммарным временем.
+"""
+import json
+import logging
+import re
+import sqlite3
+import time
+from collections import namedtuple
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from .sidecar import SidecarDB
+
+logger = logging.getLogger('core.slowlog')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS slow_queries (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    view TEXT NOT NULL,
+    sql TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    params TEXT NOT NULL,
+    duration_ms REAL NOT NULL,
+    plan TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS slow_queries_fingerprint
+    ON slow_queries (fingerprint);
+'''
+# Сколько последних записей хранится; старые удаляются раз в PRUNE_EVERY.
+KEEP = 10000
+PRUNE_EVERY = 1000
+EXPLAINABLE = ('SELECT', 'WITH')
+# Списки IN разной длины сводятся к одному отпечатку.
+IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)+\s*\)')
+
+Offender = namedtuple(
+    'Offender',
+    'fingerprint count total_ms avg_ms max_ms views params plan')
+
+
+def fingerprint(sql):
+    return IN_LIST.sub('(%s, ...)', ' '.join(sql.split()))
+
+
+def redact(params):
+    """Параметры без содержимого строк: остаются число, типы и длины."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: _redact(value) for key, value in params.items()}
+    return [_redact(value) for value in params]
+
+
+def _redact(value):
+    if isinstance(value, (str, bytes, bytearray, memoryview)):
+        return f'<{type(value).__name__} {len(value)}>'
+    return value
+
+
+def explain(connection, sql, params):
+    """План запроса; курсор создается мимо execute_wrapper."""
+    if not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return ''
+    cursor = connection.create_cursor()
+    try:
+        with connection.wrap_database_errors:
+            cursor.execute(
+                f'{connection.ops.explain_query_prefix()} {sql}', params)
+            rows = cursor.fetchall()
+    except DatabaseError as exc:
+        return f'EXPLAIN не выполнен: {exc}'
+    finally:
+        cursor.close()
+    if connection.vendor != 'sqlite':
+        return '\n'.join(str(row[0]) for row in rows)
+    # Строки SQLite: (id, parent, notused, detail) -- дерево по parent.
+    depth = {}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node] + detail)
+    return '\n'.join(lines)
+
+
+class SlowLog(SidecarDB):
+    schema = SCHEMA
+
+    def add(self, view, sql, params, duration, plan):
+        with self.locked() as connection:
+            row_id = connection.execute(
+                'INSERT INTO slow_queries (created, view, sql, fingerprint, '
+                'params, duration_ms, plan) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (time.time(), view, sql, fingerprint(sql),
+                 json.dumps(redact(params), ensure_ascii=False, default=str),
+                 duration * 1000, plan),
+            ).lastrowid
+            if row_id % PRUNE_EVERY == 0:
+                connection.execute(
+                    'DELETE FROM slow_queries WHERE id <= ?',
+                    (row_id - KEEP,))
+
+    def top(self, limit=10, view=None, since=None):
+        """Offender по отпечаткам запросов, самые затратные первыми.
+
+        Параметры и план берутся у самого долгого выполнения.
+        """
+        where, args = [], []
+        if view:
+            where.append('view = ?')
+            args.append(view)
+        if since:
+            where.append('created >= ?')
+            args.append(since)
+        # Самое долгое выполнение ищется среди тех же отфильтрованных.
+        filters = ''.join(f' AND {condition}' for condition in where)
+        sql = f'''
+            SELECT fingerprint, COUNT(*), SUM(duration_ms),
+                   AVG(duration_ms), MAX(duration_ms),
+                   GROUP_CONCAT(DISTINCT view),
+                   (SELECT params || char(0) || plan FROM slow_queries
+                    WHERE fingerprint = logged.fingerprint{filters}
+                    ORDER BY duration_ms DESC LIMIT 1)
+            FROM slow_queries AS logged
+            {'WHERE ' + ' AND '.join(where) if where else ''}
+            GROUP BY fingerprint
+            ORDER BY SUM(duration_ms) DESC
+            LIMIT ?
+        '''
+        with self.locked() as connection:
+            rows = connection.execute(
+                sql, args + args + [limit]).fetchall()
+        return [
+            Offender(*row[:5], sorted(row[5].split(',')),
+                     *row[6].split('\0', 1))
+            for row in rows
+        ]
+
+    def clear(self):
+        with self.locked() as connection:
+            connection.execute('DELETE FROM slow_queries')
+
+
+_logs = {}
+
+
+def slow_log():
+    path = settings.SLOW_QUERY_DB
+    if path not in _logs:
+        _logs[path] = SlowLog(path)
+    return _logs[path]
+
+
+def record(connection, view, sql, params, duration, many=False):
+    # У executemany наборов параметров много; план по ним не строится.
+    plan = '' if many else explain(connection, sql, params)
+    logger.warning('%s: %.1f мс %s', view, duration * 1000, sql)
+    try:
+        slow_log().add(view, sql, params, duration, plan)
+    except sqlite3.Error:
+        logger.exception('Журнал медленных запросов недоступен')
+
+
+@contextmanager
+def watch(get_view, threshold):
+    """Записывает запросы внутри блока, шедшие дольше ``threshold`` с.
+
+    ``get_view`` вызывается при записи: имя адреса становится известно
+    только после разбора URL.
+    """
+    def execute(run, sql, params, many, context):
+        started = time.perf_counter()
+        result = run(sql, params, many, context)
+        duration = time.perf_counter() - started
+        if duration >= threshold:
+            record(context['connection'], get_view(), sql,
+                   None if many else params, duration, many)
+        return result
+
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(execute))
+        yield
@@ -0,0 +1,49 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class HashedFileSystemStorage(FileSystemStorage):
+    """Файловое хранилище, адресуемое содержимым.
+
+    Файл сохраняется под SHA-256 своего содержимого:
+    ``<каталог upload_to>/<2 знака хеша>/<хеш>.<расширение>``. Хеш
+    считается при потоковой записи во временный файл. Если такой файл
+    уже есть, копия не записывается, и все загрузки одной картинки
+    ссылаются на один файл. Поэтому файлы из этого хранилища нельзя
+    удалять вместе с одной из ссылающихся записей.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Итоговое имя все равно определяется содержимым в _save.
+        return name
+
+    def _save(self, name, content):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        os.makedirs(self.path(directory), exist_ok=True)
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(
+                dir=self.path(directory), delete=False) as temporary:
+            for chunk in content.chunks():
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                digest.update(chunk)
+                temporary.write(chunk)
+        digest = digest.hexdigest()
+        name = os.path.join(directory, digest[:2], digest + extension)
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            os.remove(temporary.name)
+        else:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            # Переименование атомарно: одновременная загрузка той же
+            # картинки просто заменит файл идентичным.
+            os.replace(temporary.name, full_path)
+            # Временный файл создается с правами 0600.
+            os.chmod(full_path, self.file_permissions_mode or 0o644)
+        return name.replace('\\', '/')
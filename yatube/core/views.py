@@ -1,13 +1,35 @@
+from hmac import compare_digest
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from .metrics import CONTENT_TYPE, registry
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
 
 
+def permission_denied(request, exception):
+    return render(request, 'core/403.html', {'path': request.path}, status=403)
+
+
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
 
 
 def server_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+def metrics(request):
+    # Адрес клиента за прокси не говорит, кто спрашивает, поэтому
+    # сборщик предъявляет токен: Authorization: Bearer <METRICS_TOKEN>.
+    # compare_digest сравнивает строки только из ASCII, байты -- любые.
+    token = settings.METRICS_TOKEN
+    if not settings.METRICS_ENABLED or not token or not compare_digest(
+            request.META.get('HTTP_AUTHORIZATION', '').encode(),
+            f'Bearer {token}'.encode()):
+        raise Http404
+    return HttpResponse(registry.exposition(), content_type=CONTENT_TYPE)
@@ -1,15 +1,25 @@
 from django.contrib import admin
-from .models import Post, Group, Comment
+from .models import AuthorStats, Post, Group, Comment
 
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     search_fields = ('text',)
-    list_filter = ('pub_date',)
+    list_filter = ('pub_date', 'delivery')
     list_editable = ('group',)
     empty_value_display = '-пусто-'
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).for_admin()
+
 
 admin.site.register(Group)
 admin.site.register(Comment)
+
+
+@admin.register(AuthorStats)
+class AuthorStatsAdmin(admin.ModelAdmin):
+    list_display = ('author', 'posts_count', 'followers_count',
+                    'following_count')
+    search_fields = ('author__username',)
@@ -0,0 +1,157 @@
+"""JSON API только для чтения: те же ленты и страницы, что и в HTML.
+
+Списки отдаются страницами курсорной пагинации::
+
+    {"results": [...], "next": "<after>", "previous": "<before>"}
+
+Параметр ``?fields=id,text,author`` оставляет в объектах только
+перечисленные поля. Выборки и условный GET те же, что у HTML-страниц.
+"""
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+
+from core.budgets import query_budget
+
+from . import cache
+from .models import Group, Post, User
+from .paginators import CursorPaginator
+from .timeline import follow_feed
+from .views import (
+    LIMIT_POST, comments_page, etag_by_tags, group_page_tags, post_page_tags,
+    profile_page_tags,
+)
+
+JSON_PARAMS = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+def _author(user):
+    return {'username': user.username, 'name': user.get_full_name()}
+
+
+def _group(post):
+    if post.group_id is None:
+        return None
+    return {'slug': post.group.slug, 'title': post.group.title}
+
+
+def _text(post):
+    # В лентах полный текст не читается: отдается его начало.
+    if 'text' in post.get_deferred_fields():
+        return post.excerpt
+    return post.text
+
+
+POST_FIELDS = {
+    'id': lambda post: post.pk,
+    'text': _text,
+    'truncated': lambda post: ('text' in post.get_deferred_fields()
+                               and post.is_truncated),
+    'pub_date': lambda post: post.pub_date.isoformat(),
+    'author': lambda post: _author(post.author),
+    'group': _group,
+    'image': lambda post: post.image.url if post.image else None,
+    'comments_count': lambda post: post.comments_count,
+}
+# ETag лент не зависит от комментариев, поэтому их число отдается
+# только в посте.
+FEED_FIELDS = {name: getter for name, getter in POST_FIELDS.items()
+               if name != 'comments_count'}
+COMMENT_FIELDS = {
+    'id': lambda comment: comment.pk,
+    'text': lambda comment: comment.text,
+    'created': lambda comment: comment.created.isoformat(),
+    'author': lambda comment: _author(comment.author),
+}
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def selected_fields(request, catalog):
+    """Сериализаторы полей из ``?fields=``; по умолчанию все поля."""
+    names = request.GET.get('fields')
+    if not names:
+        return catalog
+    names = [name.strip() for name in names.split(',') if name.strip()]
+    unknown = [name for name in names if name not in catalog]
+    if unknown:
+        raise FieldsError('Неизвестные поля: ' + ', '.join(unknown))
+    return {name: catalog[name] for name in names}
+
+
+def serialize(obj, fields):
+    return {name: getter(obj) for name, getter in fields.items()}
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def error(message, status=400):
+    return json_response({'error': message}, status=status)
+
+
+def page_response(request, page, catalog):
+    try:
+        fields = selected_fields(request, catalog)
+    except FieldsError as exc:
+        return error(str(exc))
+    return json_response({
+        'results': [serialize(obj, fields) for obj in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def feed_page(request, posts):
+    page = CursorPaginator(posts, LIMIT_POST).get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    return page_response(request, page, FEED_FIELDS)
+
+
+@query_budget(3)
+@etag_by_tags(cache.index_tags)
+def index(request):
+    return feed_page(request, Post.objects.for_feed())
+
+
+@query_budget(5)
+@etag_by_tags(group_page_tags)
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_page(request, group.posts.for_feed())
+
+
+@query_budget(5)
+@etag_by_tags(profile_page_tags)
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_page(request, author.posts.for_feed())
+
+
+@query_budget(4)
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return error('Требуется вход', status=401)
+    return feed_page(request, follow_feed(request.user))
+
+
+@query_budget(4)
+@etag_by_tags(post_page_tags)
+def post_detail(request, post_id):
+    post = get_object_or_404(Post.objects.for_detail(), id=post_id)
+    try:
+        fields = selected_fields(request, POST_FIELDS)
+    except FieldsError as exc:
+        return error(str(exc))
+    return json_response(serialize(post, fields))
+
+
+@query_budget(2)
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    page = comments_page(post.pk, request.GET.get('after'))
+    return page_response(request, page, COMMENT_FIELDS)
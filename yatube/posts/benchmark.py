@@ -0,0 +1,255 @@
+"""Нагрузочный прогон страниц posts по засеянным данным.
+
+Каждая страница из ``posts.urls`` запрашивается тестовым клиентом
+гостем и вошедшим пользователем. Для каждой пары (страница, клиент)
+считаются перцентили задержки, пропускная способность, число и время
+SQL-запросов и время рендеринга шаблонов. Результаты сохраняются в JSON
+и сравниваются с сохраненным ранее базовым прогоном.
+
+Данные создает команда ``gendata``; параметры адресов (группа, автор,
+пост) выбираются из них.
+"""
+import json
+import logging
+import math
+import subprocess
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.template.backends.django import Template
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+
+from . import urls
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+# Страницы, которые меняют данные, в прогон не входят.
+SKIP = {'add_comment', 'profile_follow', 'profile_unfollow'}
+CLIENTS = ('anonymous', 'user')
+PERCENTILES = (50, 95, 99)
+# Метрики, рост которых считается регрессией.
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries', 'sql_ms', 'render_ms')
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу."""
+    values = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(values)))
+    return values[rank - 1]
+
+
+@contextmanager
+def render_timer():
+    """Считает суммарное время рендеринга шаблонов представлений.
+
+    Замеряется Template бэкенда, через который идут ``render`` и
+    ``render_to_string``; вложенные include и шаблоны, отрендеренные
+    внутри другого (карточки ``posts.cards``), входят во время внешнего.
+    """
+    timings = []
+    depth = [0]
+    original = Template.render
+
+    def render(self, *args, **kwargs):
+        depth[0] += 1
+        started = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            depth[0] -= 1
+            if not depth[0]:
+                timings.append(time.perf_counter() - started)
+
+    Template.render = render
+    try:
+        yield timings
+    finally:
+        Template.render = original
+
+
+@contextmanager
+def sql_timer():
+    """Считает запросы и их время с точностью perf_counter.
+
+    ``connection.queries`` округляет время до миллисекунды, а запросы
+    по индексу обычно быстрее.
+    """
+    timings = []
+
+    def execute(run, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return run(sql, params, many, context)
+        finally:
+            timings.append(time.perf_counter() - started)
+
+    with connection.execute_wrapper(execute):
+        yield timings
+
+
+@contextmanager
+def quiet_requests():
+    # Ответы 4xx (403 для чужой выгрузки и т. п.) ожидаемы в прогоне.
+    logger = logging.getLogger('django.request')
+    level = logger.level
+    logger.setLevel(logging.ERROR)
+    try:
+        yield
+    finally:
+        logger.setLevel(level)
+
+
+def url_params():
+    """Параметры адресов из данных: самые насыщенные группа, автор, пост.
+
+    Возвращает (вошедший пользователь, kwargs для reverse, GET-параметры
+    по имени страницы).
+    """
+    viewer = User.objects.filter(
+        pk__in=AuthorStats.objects.filter(posts_count__gt=0).order_by(
+            '-following_count').values('author')[:1]).first()
+    if viewer is None:
+        raise LookupError('Нет данных: сначала запустите gendata')
+    post = Post.objects.filter(author=viewer).order_by(
+        '-comments_count').only('pk', 'excerpt').first()
+    group = Group.objects.annotate(n=Count('posts')).order_by('-n').first()
+    words = [word for word in post.excerpt.split() if word.isalpha()]
+    kwargs = {
+        'slug': group.slug if group else 'missing',
+        'username': viewer.username,
+        'post_id': post.pk,
+    }
+    query = {
+        'search': {'q': words[0] if words else 'пост'},
+        'profile_export': {'format': 'ndjson'},
+    }
+    return viewer, kwargs, query
+
+
+def pages(kwargs, query):
+    """(имя, адрес) всех страниц posts.urls, кроме SKIP."""
+    for pattern in urls.urlpatterns:
+        if pattern.name in SKIP:
+            continue
+        args = {name: kwargs[name] for name in pattern.pattern.converters}
+        url = reverse(f'{urls.app_name}:{pattern.name}', kwargs=args)
+        if pattern.name in query:
+            url += '?' + urlencode(query[pattern.name])
+        yield pattern.name, url
+
+
+def measure(client, url, requests, warmup=1, cold=False):
+    """Метрики ``requests`` запросов к ``url`` после ``warmup`` прогревов.
+
+    При ``cold`` кеш очищается перед каждым запросом (вне замера), так
+    что измеряется путь без кешированных фрагментов.
+    """
+    for _ in range(warmup):
+        _get(client, url)
+    latencies, queries, sql, renders = [], [], [], []
+    status = None
+    for _ in range(requests):
+        if cold:
+            cache.clear()
+        with sql_timer() as queries_timings, render_timer() as timings:
+            started = time.perf_counter()
+            status = _get(client, url)
+            latencies.append(time.perf_counter() - started)
+        queries.append(len(queries_timings))
+        sql.append(sum(queries_timings))
+        renders.append(sum(timings))
+    total = sum(latencies)
+    result = {'url': url, 'status': status, 'requests': requests}
+    for percent in PERCENTILES:
+        result[f'p{percent}_ms'] = round(
+            percentile(latencies, percent) * 1000, 3)
+    result.update({
+        'rps': round(requests / total, 1) if total else None,
+        'queries': round(sum(queries) / requests, 2),
+        'sql_ms': round(sum(sql) / requests * 1000, 3),
+        'render_ms': round(sum(renders) / requests * 1000, 3),
+    })
+    return result
+
+
+def run(requests=50, warmup=1, cold=False, only=None, progress=None):
+    """Прогоняет все страницы; возвращает отчет для ``save``."""
+    viewer, kwargs, query = url_params()
+    clients = {'anonymous': Client(), 'user': Client()}
+    clients['user'].force_login(viewer)
+    views = {}
+    with quiet_requests():
+        for name, url in pages(kwargs, query):
+            if only and name not in only:
+                continue
+            for client_name in CLIENTS:
+                key = f'{name} {client_name}'
+                views[key] = measure(clients[client_name], url, requests,
+                                     warmup, cold)
+                if progress is not None:
+                    progress(key, views[key])
+    return {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'commit': _commit(),
+            'requests': requests,
+            'cold': cold,
+            'dataset': {model.__name__: model.objects.count() for model in
+                        (User, Group, Post, Comment, Follow)},
+        },
+        'views': views,
+    }
+
+
+def compare(report, baseline, threshold=0.1):
+    """Строки сравнения с базовым прогоном и список регрессий.
+
+    Регрессия -- рост метрики из METRICS больше чем на ``threshold``
+    (доля) относительно базового значения.
+    """
+    rows, regressions = [], []
+    for key, current in report['views'].items():
+        previous = baseline['views'].get(key)
+        if previous is None:
+            continue
+        for metric in METRICS:
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            rows.append((key, metric, old, new, change))
+            if change > threshold:
+                regressions.append((key, metric, old, new, change))
+    return rows, regressions
+
+
+def save(report, path):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+def load(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def _get(client, url):
+    response = client.get(url)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response.status_code
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
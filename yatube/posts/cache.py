@@ -0,0 +1,51 @@
+"""Теги, от которых зависят закешированные страницы постов."""
+
+INDEX = 'index'
+GROUPS = 'groups'
+AUTHORS = 'authors'
+
+
+def post_tag(post_id):
+    return f'post:{post_id}'
+
+
+def author_tag(author_id):
+    return f'author:{author_id}'
+
+
+def group_tag(slug):
+    return f'group:{slug}'
+
+
+def comments_tag(post_id):
+    return f'comments:{post_id}'
+
+
+# Наборы тегов страниц: по ним строятся ключи кеша шаблонов и ETag.
+
+def index_tags():
+    return (INDEX,)
+
+
+def group_page_tags(slug):
+    return (group_tag(slug), AUTHORS)
+
+
+def profile_tags(author_id):
+    return (author_tag(author_id), GROUPS)
+
+
+def comment_list_tags(post_id):
+    # Комментарии показывают имена и ссылки на профили комментаторов.
+    return (comments_tag(post_id), AUTHORS)
+
+
+def detail_tags(post_id, author_id):
+    return (post_tag(post_id), author_tag(author_id),
+            *comment_list_tags(post_id))
+
+
+def card_tags(post_id):
+    # Карточка показывает имя автора и группу: их правка сбрасывает
+    # все карточки, но случается редко.
+    return (post_tag(post_id), AUTHORS, GROUPS)
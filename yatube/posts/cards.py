@@ -0,0 +1,49 @@
+"""Кеш отрендеренных карточек постов в лентах.
+
+Карточка не зависит от читателя, поэтому HTML каждой хранится в кеше
+по ключу из id поста и версии его тегов (``cache.card_tags``). Версии и
+карточки страницы читаются двумя ``get_many``; шаблон рендерится только
+для промахов, и только для них ищутся миниатюры.
+"""
+from django.core.cache import cache as django_cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from core.cache import tags_versions
+
+from . import cache, thumbnails
+
+CARD_KEY = 'post_card:{template}:{size}:{post_id}:{version}'
+# Версия в ключе делает устаревшую карточку недостижимой, поэтому
+# карточки могут жить дольше фрагментов страниц.
+CARD_TIMEOUT = 24 * 3600
+
+
+def render_cards(posts, template_name, size):
+    """HTML карточек ``posts`` в их порядке.
+
+    Шаблон ``template_name`` получает в контексте ``post`` и ``size``
+    (размер миниатюры).
+    """
+    posts = list(posts)
+    versions = tags_versions(cache.card_tags(post.pk) for post in posts)
+    keys = [
+        CARD_KEY.format(template=template_name, size=size, post_id=post.pk,
+                        version=version)
+        for post, version in zip(posts, versions)
+    ]
+    cards = django_cache.get_many(keys)
+    missing = [(post, key) for post, key in zip(posts, keys)
+               if key not in cards]
+    if missing:
+        template = get_template(template_name)
+        prefetched = thumbnails.lookup_many(
+            [(post.image, size) for post, _ in missing if post.image])
+        rendered = {
+            key: template.render({'post': post, 'size': size,
+                                  thumbnails.PREFETCHED: prefetched})
+            for post, key in missing
+        }
+        django_cache.set_many(rendered, CARD_TIMEOUT)
+        cards.update(rendered)
+    return [mark_safe(cards[key]) for key in keys]
@@ -0,0 +1,120 @@
+from itertools import islice
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.cache import invalidate
+
+from . import cache
+from .models import AuthorStats, Comment, Follow, Post, User
+
+BATCH_SIZE = 1000
+AUTHOR_COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def change_author(author_id, **deltas):
+    """Сдвигает счетчики автора атомарным UPDATE.
+
+    Если строки счетчиков еще нет, при увеличении она создается
+    полным пересчетом. При уменьшении строка не создается: автор может
+    удаляться каскадом вместе со своими счетчиками.
+    """
+    updated = AuthorStats.objects.filter(author_id=author_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    if not updated and any(delta > 0 for delta in deltas.values()):
+        AuthorStats.objects.update_or_create(
+            author_id=author_id,
+            defaults=_author_annotations(
+                User.objects.filter(pk=author_id)
+            ).values(*AUTHOR_COUNTERS).get(),
+        )
+
+
+def change_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta)
+
+
+def followers_count(author_id):
+    stats = AuthorStats.objects.filter(author_id=author_id).values_list(
+        'followers_count', flat=True).first()
+    if stats is None:
+        return Follow.objects.filter(author_id=author_id).count()
+    return stats
+
+
+def recount():
+    """Сверяет все счетчики с данными и исправляет расхождения.
+
+    Возвращает число исправленных строк счетчиков авторов и постов.
+    ``bulk_update`` не отправляет сигналы, поэтому кеш страниц с
+    исправленными счетчиками сбрасывается здесь.
+    """
+    return _recount_authors(), _recount_posts()
+
+
+def _recount_authors():
+    fixed = 0
+    rows = _author_annotations(User.objects.order_by('pk')).values_list(
+        'pk', *AUTHOR_COUNTERS).iterator()
+    for batch in _batches(rows):
+        stats = AuthorStats.objects.in_bulk([row[0] for row in batch])
+        created, changed = [], []
+        for pk, *values in batch:
+            actual = dict(zip(AUTHOR_COUNTERS, values))
+            current = stats.get(pk)
+            if current is None:
+                created.append(AuthorStats(author_id=pk, **actual))
+            elif any(getattr(current, field) != value
+                     for field, value in actual.items()):
+                for field, value in actual.items():
+                    setattr(current, field, value)
+                changed.append(current)
+        AuthorStats.objects.bulk_create(created)
+        AuthorStats.objects.bulk_update(changed, list(AUTHOR_COUNTERS))
+        invalidate(*(cache.author_tag(stats.author_id)
+                     for stats in created + changed))
+        fixed += len(created) + len(changed)
+    return fixed
+
+
+def _recount_posts():
+    fixed = 0
+    rows = Post.objects.annotate(
+        actual=_count(Comment, 'post')
+    ).exclude(comments_count=F('actual')).order_by().values_list(
+        'pk', 'actual').iterator()
+    for batch in _batches(rows):
+        Post.objects.bulk_update(
+            [Post(pk=pk, comments_count=actual) for pk, actual in batch],
+            ['comments_count'],
+        )
+        invalidate(*(cache.post_tag(pk) for pk, _ in batch))
+        fixed += len(batch)
+    return fixed
+
+
+def _author_annotations(queryset):
+    return queryset.annotate(**{
+        field: _count(model, lookup)
+        for field, (model, lookup) in AUTHOR_COUNTERS.items()
+    })
+
+
+def _count(model, lookup):
+    counts = model.objects.filter(**{lookup: OuterRef('pk')}).order_by(
+    ).values(lookup).annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def _batches(rows):
+    while True:
+        batch = list(islice(rows, BATCH_SIZE))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,177 @@
+"""Синтетические данные продакшен-масштаба для проверок производительности.
+
+Пользователи и группы создаются ``bulk_create``, а подписки, посты и
+комментарии проходят через ``importer.Importer`` теми же пачками, что и
+при переносе данных. Популярность авторов и групп распределена по
+степенному закону, даты постов растянуты на годы до ``until``.
+
+При одинаковых параметрах и ``seed`` содержимое совпадает от запуска
+к запуску; меняются только первичные ключи, если база не пустая.
+"""
+import os
+import random
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.db.models import Max
+from faker import Faker
+from PIL import Image
+
+from .importer import BATCH_SIZE, Importer
+from .models import Group, Post, User
+
+USERNAME = 'user{:06d}'
+GROUP_SLUG = 'group-{:04d}'
+PASSWORD = 'password'
+UNTIL = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+# Показатель степенного закона популярности авторов, групп и постов.
+ZIPF_EXPONENT = 1.1
+# Доля постов без группы.
+NO_GROUP_SHARE = 0.3
+IMAGE_POOL = 16
+
+
+def zipf_weights(n, exponent=ZIPF_EXPONENT):
+    """Накопленные веса для random.choices: ранг k весит 1 / k**exponent."""
+    return list(accumulate(1 / rank ** exponent
+                           for rank in range(1, n + 1)))
+
+
+class Dataset:
+    def __init__(self, users=1000, groups=20, posts=10000, comments=20000,
+                 follows=20, years=3, images=0.0, seed=0, until=UNTIL,
+                 batch_size=BATCH_SIZE, progress=None):
+        self.users = users
+        self.groups = groups
+        self.posts = posts
+        self.comments = comments
+        self.follows = follows
+        self.span = timedelta(days=365 * years)
+        self.images = images
+        self.seed = seed
+        self.until = until
+        self.batch_size = batch_size
+        self.progress = progress
+        self.random = random.Random(seed)
+        self.faker = Faker('ru_RU')
+        self.faker.seed_instance(seed)
+        self.importers = []
+
+    def generate(self):
+        """Создает данные; возвращает использованные Importer."""
+        self.usernames = [USERNAME.format(n) for n in range(self.users)]
+        # Ранги популярности: первые в списках получают больше всего.
+        self.authors = self.random.sample(self.usernames, self.users)
+        self.author_weights = zipf_weights(self.users)
+        self._create_users()
+        self._create_groups()
+        self.first_id = (Post.objects.aggregate(
+            last=Max('pk'))['last'] or 0) + 1
+        image_dir = self._image_pool() if self.images else None
+        try:
+            self._load('follows', self._follow_rows())
+            self._load('posts', self._post_rows(), images=image_dir)
+            self._load('comments', self._comment_rows())
+        finally:
+            if image_dir:
+                shutil.rmtree(image_dir, ignore_errors=True)
+        self.importers[-1].finish()
+        return self.importers
+
+    def _load(self, kind, rows, **options):
+        importer = Importer(kind, batch_size=self.batch_size,
+                            progress=self.progress, **options)
+        self.importers.append(importer)
+        importer.run(enumerate(rows, start=1))
+
+    def _create_users(self):
+        password = make_password(PASSWORD)
+        users = (
+            User(username=username, password=password,
+                 first_name=self.faker.first_name(),
+                 last_name=self.faker.last_name())
+            for username in self.usernames
+        )
+        while True:
+            batch = list(islice(users, self.batch_size))
+            if not batch:
+                return
+            User.objects.bulk_create(batch, ignore_conflicts=True)
+
+    def _create_groups(self):
+        self.slugs = [GROUP_SLUG.format(n) for n in range(self.groups)]
+        Group.objects.bulk_create([
+            Group(slug=slug, title=self.faker.catch_phrase()[:200],
+                  description=self.faker.paragraph()[:400])
+            for slug in self.slugs
+        ], ignore_conflicts=True)
+        self.group_weights = zipf_weights(self.groups)
+
+    def _follow_rows(self):
+        # Среднее 0 -- подписок нет; expovariate(1 / 0) не вызывается.
+        if not self.follows:
+            return
+        for username in self.usernames:
+            count = min(self.users - 1,
+                        int(self.random.expovariate(1 / self.follows)))
+            authors = set(self.random.choices(
+                self.authors, cum_weights=self.author_weights, k=count))
+            for author in sorted(authors - {username}):
+                yield {'user': username, 'author': author}
+
+    def _post_rows(self):
+        for n in range(self.posts):
+            group = None
+            if self.groups and self.random.random() >= NO_GROUP_SHARE:
+                group = self.random.choices(
+                    self.slugs, cum_weights=self.group_weights)[0]
+            row = {
+                'id': self.first_id + n,
+                'author': self.random.choices(
+                    self.authors, cum_weights=self.author_weights)[0],
+                'text': self._text(),
+                'group': group,
+                'pub_date': self._post_date(n).isoformat(),
+            }
+            if self.random.random() < self.images:
+                row['image'] = f'{self.random.randrange(IMAGE_POOL)}.png'
+            yield row
+
+    def _comment_rows(self):
+        if not self.posts:
+            return
+        # Самые обсуждаемые посты -- случайные, а не самые новые.
+        ranks = self.random.sample(range(self.posts), self.posts)
+        weights = zipf_weights(self.posts)
+        for _ in range(self.comments):
+            n = self.random.choices(ranks, cum_weights=weights)[0]
+            published = self._post_date(n)
+            delay = (self.until - published) * self.random.random() ** 4
+            yield {
+                'post': self.first_id + n,
+                'author': self.random.choice(self.usernames),
+                'text': self.faker.sentence(),
+                'created': (published + delay).isoformat(),
+            }
+
+    def _post_date(self, n):
+        # Дата выводится из номера поста, чтобы комментарии не требовали
+        # держать даты всех постов в памяти.
+        share = random.Random(f'{self.seed}:{n}').random()
+        return self.until - self.span * share
+
+    def _text(self):
+        # Длины текстов с тяжелым хвостом: много коротких, мало длинных.
+        length = min(5000, int(self.random.paretovariate(1.2) * 100))
+        return self.faker.text(max_nb_chars=max(length, 20))
+
+    def _image_pool(self):
+        directory = tempfile.mkdtemp()
+        for n in range(IMAGE_POOL):
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            Image.new('RGB', (1200, 800), color).save(
+                os.path.join(directory, f'{n}.png'))
+        return directory
@@ -0,0 +1,137 @@
+"""Потоковая выгрузка постов и комментариев автора или группы.
+
+Строки читаются ``iterator()`` кусками по EXPORT_CHUNK и сразу
+отдаются клиенту, поэтому память не растет с размером выгрузки.
+
+Форматы:
+
+* ndjson -- строки ``{"type": "post" | "comment", ...}``;
+* zip -- ``posts.jsonl``, ``comments.jsonl`` и картинки в ``images/``.
+  Поля строк совпадают с форматом команды ``bulkimport``, поэтому архив
+  загружается обратно командами
+  ``bulkimport posts posts.jsonl --images images`` и
+  ``bulkimport comments comments.jsonl``.
+"""
+import json
+import zipfile
+
+from django.http import StreamingHttpResponse
+
+from .models import Comment, Post
+
+EXPORT_CHUNK = 2000
+NDJSON = 'ndjson'
+ZIP = 'zip'
+FORMATS = (NDJSON, ZIP)
+CONTENT_TYPES = {NDJSON: 'application/x-ndjson', ZIP: 'application/zip'}
+IMAGES_DIR = 'images/'
+FILE_CHUNK = 64 * 1024
+
+
+def author_scope(author):
+    return (Post.objects.filter(author=author),
+            Comment.objects.filter(post__author=author))
+
+
+def group_scope(group):
+    return (Post.objects.filter(group=group),
+            Comment.objects.filter(post__group=group))
+
+
+def post_rows(posts):
+    rows = posts.order_by('pk').values_list(
+        'pk', 'author__username', 'text', 'group__slug', 'pub_date',
+        'image')
+    for pk, author, text, group, pub_date, image in rows.iterator(
+            chunk_size=EXPORT_CHUNK):
+        yield {'id': pk, 'author': author, 'text': text, 'group': group,
+               'pub_date': pub_date.isoformat(), 'image': image or None}
+
+
+def comment_rows(comments):
+    rows = comments.order_by('pk').values_list(
+        'post_id', 'author__username', 'text', 'created')
+    for post_id, author, text, created in rows.iterator(
+            chunk_size=EXPORT_CHUNK):
+        yield {'post': post_id, 'author': author, 'text': text,
+               'created': created.isoformat()}
+
+
+def dumps(row):
+    return json.dumps(row, ensure_ascii=False,
+                      separators=(',', ':')).encode() + b'\n'
+
+
+def ndjson(posts, comments):
+    for row in post_rows(posts):
+        yield dumps({'type': 'post', **row})
+    for row in comment_rows(comments):
+        yield dumps({'type': 'comment', **row})
+
+
+class _Sink:
+    """Приемник zipfile без seek: копит байты до следующего yield."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def zip_stream(posts, comments):
+    """Zip-архив, который отдается по мере записи.
+
+    Поток не поддерживает seek, поэтому zipfile пишет размеры записей
+    после их данных (data descriptor).
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        with archive.open('posts.jsonl', 'w', force_zip64=True) as entry:
+            for row in post_rows(posts):
+                entry.write(dumps(row))
+                yield sink.pop()
+        with archive.open('comments.jsonl', 'w', force_zip64=True) as entry:
+            for row in comment_rows(comments):
+                entry.write(dumps(row))
+                yield sink.pop()
+        storage = Post._meta.get_field('image').storage
+        # Одинаковые картинки хранятся одним файлом и пишутся один раз.
+        images = posts.exclude(image='').order_by('image').values_list(
+            'image', flat=True).distinct()
+        for name in images.iterator(chunk_size=EXPORT_CHUNK):
+            if not storage.exists(name):
+                continue
+            with storage.open(name) as source, archive.open(
+                    IMAGES_DIR + name, 'w', force_zip64=True) as entry:
+                for chunk in iter(lambda: source.read(FILE_CHUNK), b''):
+                    entry.write(chunk)
+                    yield sink.pop()
+    yield sink.pop()
+
+
+def stream(scope, fmt):
+    if fmt == ZIP:
+        return zip_stream(*scope)
+    return ndjson(*scope)
+
+
+def response(scope, filename, fmt):
+    """StreamingHttpResponse с выгрузкой в формате ``fmt``."""
+    if fmt not in FORMATS:
+        fmt = NDJSON
+    response = StreamingHttpResponse(
+        (chunk for chunk in stream(scope, fmt) if chunk),
+        content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = (
+        f'attachment; filename="{filename}.{fmt}"')
+    return response
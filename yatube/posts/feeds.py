@@ -0,0 +1,159 @@
+"""RSS и Atom ленты: общая, сообщества и автора.
+
+Ленты строятся из тех же выборок, что и HTML-страницы, и кешируются
+готовыми байтами под версией тегов страницы: новый пост сбрасывает
+ленты своей группы, автора и общую. ETag тоже берется из версии, так
+что повторный опрос без изменений получает 304 без запросов к постам.
+"""
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache as django_cache
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse, reverse_lazy
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.http import quote_etag
+from django.utils.text import Truncator
+
+from core.budgets import query_budget
+from core.cache import tags_version
+
+from . import cache
+from .models import Group, Post, User
+from .views import group_page_tags, profile_page_tags
+
+FEED_LENGTH = 20
+FEED_KEY = 'feed:{}:{}:{}'
+FEED_TIMEOUT = 60 * 60 * 24
+TITLE_WORDS = 8
+
+
+class PostsFeed(Feed):
+    title = 'Yatube: последние записи'
+    link = reverse_lazy('posts:index')
+    description = 'Новые записи всех авторов'
+
+    def posts(self, obj):
+        return Post.objects.for_feed()
+
+    def items(self, obj=None):
+        return self.posts(obj)[:FEED_LENGTH]
+
+    def item_title(self, post):
+        return Truncator(post.excerpt).words(TITLE_WORDS, truncate='…')
+
+    def item_description(self, post):
+        return post.excerpt
+
+    def item_link(self, post):
+        return reverse('posts:post_detail', args=[post.pk])
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_author_name(self, post):
+        return post.author.get_full_name() or post.author.username
+
+    def item_categories(self, post):
+        return [post.group.title] if post.group_id else []
+
+
+class GroupFeed(PostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(
+            Group.objects.only('slug', 'title', 'description'), slug=slug)
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def link(self, group):
+        return reverse('posts:group_list', args=[group.slug])
+
+    def description(self, group):
+        return group.description
+
+    def posts(self, group):
+        return group.posts.for_feed()
+
+
+class AuthorFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(
+            User.objects.only('username', 'first_name', 'last_name'),
+            username=username)
+
+    def title(self, author):
+        return f'Yatube: {author.get_full_name() or author.username}'
+
+    def link(self, author):
+        return reverse('posts:profile', args=[author.username])
+
+    def description(self, author):
+        return f'Записи пользователя {author.username}'
+
+    def posts(self, author):
+        return author.posts.for_feed()
+
+
+class AtomMixin:
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self._get_dynamic_attr('description', obj)
+
+
+class AtomPostsFeed(AtomMixin, PostsFeed):
+    pass
+
+
+class AtomGroupFeed(AtomMixin, GroupFeed):
+    pass
+
+
+class AtomAuthorFeed(AtomMixin, AuthorFeed):
+    pass
+
+
+def cached_feed(feed, get_tags):
+    """Представление ленты с кешем готового XML и условным GET.
+
+    ``get_tags`` получает аргументы представления и возвращает теги
+    ленты или None, если ее нет.
+    """
+    name = type(feed).__name__
+
+    def view(request, *args, **kwargs):
+        tags = get_tags(*args, **kwargs)
+        if tags is None:
+            raise Http404
+        version = tags_version(*tags)
+        etag = quote_etag(f'{name}-{version}')
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            # Ссылки в XML абсолютные, поэтому хост входит в ключ.
+            scope = ':'.join(map(str, (request.get_host(), *args,
+                                       *kwargs.values())))
+            key = FEED_KEY.format(name, scope, version)
+            cached = django_cache.get(key)
+            if cached is None:
+                rendered = feed(request, *args, **kwargs)
+                cached = (rendered['Content-Type'], rendered.content)
+                django_cache.set(key, cached, FEED_TIMEOUT)
+            response = HttpResponse(cached[1], content_type=cached[0])
+        response['ETag'] = etag
+        return response
+    return view
+
+
+index_rss = query_budget(1)(
+    cached_feed(PostsFeed(), cache.index_tags))
+index_atom = query_budget(1)(
+    cached_feed(AtomPostsFeed(), cache.index_tags))
+group_rss = query_budget(3)(
+    cached_feed(GroupFeed(), group_page_tags))
+group_atom = query_budget(3)(
+    cached_feed(AtomGroupFeed(), group_page_tags))
+author_rss = query_budget(3)(
+    cached_feed(AuthorFeed(), profile_page_tags))
+author_atom = query_budget(3)(
+    cached_feed(AtomAuthorFeed(), profile_page_tags))
@@ -0,0 +1,351 @@
+"""Пакетная загрузка постов, комментариев и подписок.
+
+Строки читаются потоком из JSONL или CSV и пишутся пачками
+``bulk_create`` по пачке в транзакции, поэтому память не зависит от
+размера файла. Авторы и группы находятся через словари в памяти,
+которые дополняются одним запросом на пачку.
+
+``bulk_create`` не отправляет сигналы, поэтому загрузчик сам раскладывает
+посты в ленты и сбрасывает кеш страниц. Счетчики пересчитываются в
+``finish``, миниатюры создает команда ``thumbnails``.
+"""
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.cache import invalidate
+
+from . import cache, counters, timeline
+from .models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE = 1000
+KINDS = ('posts', 'comments', 'follows')
+FORMATS = ('jsonl', 'csv')
+# Сколько ошибок в строках запоминается для отчета.
+ERRORS_LIMIT = 20
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(stream, fmt):
+    """Пары (номер строки, словарь полей или RowError) из потока."""
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(stream), start=2):
+            yield number, row
+        return
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            row = RowError(f'некорректный JSON: {exc}')
+        else:
+            if not isinstance(row, dict):
+                row = RowError('ожидался JSON-объект')
+        yield number, row
+
+
+def copy_image(path):
+    """Копирует картинку в хранилище Post.image; возвращает имя или ошибку.
+
+    Выполняется и в процессах пула, поэтому ошибка возвращается, а не
+    выбрасывается.
+    """
+    field = Post._meta.get_field('image')
+    try:
+        with open(path, 'rb') as file:
+            name = field.generate_filename(None, os.path.basename(path))
+            return field.storage.save(name, File(file),
+                                      max_length=field.max_length), None
+    except OSError as exc:
+        return None, f'картинка {path}: {exc.strerror}'
+
+
+@contextmanager
+def keep_dates():
+    """Даты публикации берутся из файла, а не из auto_now_add."""
+    fields = [Post._meta.get_field('pub_date'),
+              Comment._meta.get_field('created')]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    """Загружает строки одного вида: posts, comments или follows.
+
+    Поля строк:
+
+    * posts: ``id``, ``author`` (username), ``text``, необязательные
+      ``group`` (slug), ``pub_date`` (ISO 8601), ``image`` (путь
+      относительно каталога ``images``). Идентификаторы постов
+      сохраняются, чтобы комментарии ссылались на них;
+    * comments: ``post`` (id), ``author``, ``text``, ``created``;
+    * follows: ``user``, ``author``.
+
+    Строки с ошибками пропускаются и попадают в ``errors``.
+    """
+
+    def __init__(self, kind, images=None, workers=0, create_missing=False,
+                 batch_size=BATCH_SIZE, progress=None):
+        self.kind = kind
+        self.images = images
+        self.workers = workers
+        self.create_missing = create_missing
+        self.batch_size = batch_size
+        self.progress = progress
+        self.users = {}
+        self.groups = {}
+        self.imported = 0
+        self.skipped = 0
+        self.errors = []
+        self.elapsed = 0.0
+
+    @property
+    def rate(self):
+        return self.imported / self.elapsed if self.elapsed else 0.0
+
+    def run(self, rows):
+        started = time.monotonic()
+        load = getattr(self, f'_load_{self.kind}')
+        rows = iter(rows)
+        with keep_dates(), self._executor() as executor:
+            self.executor = executor
+            while True:
+                rows_batch = list(islice(rows, self.batch_size))
+                if not rows_batch:
+                    break
+                batch = []
+                for number, row in rows_batch:
+                    if isinstance(row, RowError):
+                        self.skip(number, str(row))
+                    else:
+                        batch.append((number, row))
+                if batch:
+                    with transaction.atomic():
+                        load(batch)
+                self.elapsed = time.monotonic() - started
+                if self.progress is not None:
+                    self.progress(self)
+        return self
+
+    def finish(self):
+        """Пересчитывает счетчики после загрузки."""
+        return counters.recount()
+
+    def skip(self, number, message):
+        self.skipped += 1
+        if len(self.errors) < ERRORS_LIMIT:
+            self.errors.append(f'строка {number}: {message}')
+
+    def _load_posts(self, batch):
+        batch = self._require(batch, 'id', 'author', 'text')
+        batch = self._post_ids(batch)
+        users = self._resolve(self.users, User, 'username',
+                              [row['author'] for _, row in batch])
+        groups = self._resolve(self.groups, Group, 'slug',
+                               [row['group'] for _, row in batch
+                                if row.get('group')])
+        existing = set(Post.objects.filter(
+            pk__in=[row['id'] for _, row in batch]
+        ).values_list('pk', flat=True))
+        posts = []
+        images = []
+        for number, row in batch:
+            try:
+                post = Post(
+                    pk=row['id'],
+                    text=row['text'],
+                    author_id=self._lookup(users, row['author'], 'автор'),
+                    group_id=(self._lookup(groups, row['group'], 'группа')
+                              if row.get('group') else None),
+                    pub_date=self._date(row.get('pub_date')),
+                )
+            except (RowError, ValueError) as exc:
+                self.skip(number, str(exc))
+                continue
+            if post.pk in existing:
+                self.skip(number, f'пост {post.pk} уже есть')
+                continue
+            existing.add(post.pk)
+            posts.append(post)
+            images.append((number, row.get('image')))
+        posts = self._attach_images(posts, images)
+        timeline.choose_delivery_many(posts)
+        Post.objects.bulk_create(posts)
+        timeline.fan_out_many(posts)
+        self.imported += len(posts)
+        group_ids = {post.group_id for post in posts}
+        invalidate(
+            cache.INDEX,
+            *(cache.author_tag(post.author_id) for post in posts),
+            *(cache.group_tag(slug) for slug, pk in groups.items()
+              if pk in group_ids),
+        )
+
+    def _load_comments(self, batch):
+        batch = self._require(batch, 'post', 'author', 'text')
+        users = self._resolve(self.users, User, 'username',
+                              [row['author'] for _, row in batch])
+        comments = []
+        for number, row in batch:
+            try:
+                comments.append((number, Comment(
+                    post_id=int(row['post']),
+                    author_id=self._lookup(users, row['author'], 'автор'),
+                    text=row['text'],
+                    created=self._date(row.get('created')),
+                )))
+            except (RowError, ValueError) as exc:
+                self.skip(number, str(exc))
+        posts = set(Post.objects.filter(
+            pk__in={comment.post_id for _, comment in comments}
+        ).values_list('pk', flat=True))
+        kept = []
+        for number, comment in comments:
+            if comment.post_id in posts:
+                kept.append(comment)
+            else:
+                self.skip(number, f'пост {comment.post_id} не найден')
+        Comment.objects.bulk_create(kept)
+        self.imported += len(kept)
+        invalidate(*(cache.comments_tag(post_id) for post_id in posts))
+
+    def _load_follows(self, batch):
+        batch = self._require(batch, 'user', 'author')
+        users = self._resolve(
+            self.users, User, 'username',
+            [row[key] for _, row in batch for key in ('user', 'author')])
+        pairs = {}
+        for number, row in batch:
+            try:
+                pair = (self._lookup(users, row['user'], 'пользователь'),
+                        self._lookup(users, row['author'], 'автор'))
+            except RowError as exc:
+                self.skip(number, str(exc))
+                continue
+            if pair[0] == pair[1] or pair in pairs:
+                self.skip(number, 'повторная подписка')
+                continue
+            pairs[pair] = number
+        existing = Follow.objects.filter(
+            user_id__in={user_id for user_id, _ in pairs},
+            author_id__in={author_id for _, author_id in pairs},
+        ).values_list('user_id', 'author_id')
+        for pair in existing:
+            if pair in pairs:
+                self.skip(pairs.pop(pair), 'подписка уже есть')
+        Follow.objects.bulk_create(
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in pairs)
+        timeline.backfill_many(pairs)
+        self.imported += len(pairs)
+        invalidate(*{cache.author_tag(author_id) for _, author_id in pairs})
+
+    def _post_ids(self, batch):
+        """Строки с id, приведенным к int; остальные пропускаются.
+
+        Приведение идет до запроса существующих постов, иначе одна
+        строка с нечисловым id обрывала бы весь импорт.
+        """
+        valid = []
+        for number, row in batch:
+            try:
+                post_id = int(row['id'])
+            except (TypeError, ValueError):
+                self.skip(number, f'id поста не число: {row["id"]!r}')
+                continue
+            valid.append((number, {**row, 'id': post_id}))
+        return valid
+
+    def _require(self, batch, *fields):
+        valid = []
+        for number, row in batch:
+            missing = [field for field in fields if not row.get(field)]
+            if missing:
+                self.skip(number, 'нет полей ' + ', '.join(missing))
+            else:
+                valid.append((number, row))
+        return valid
+
+    def _resolve(self, known, model, field, values):
+        """Дополняет словарь {значение поля: pk} одним запросом."""
+        missing = set(values) - set(known)
+        if missing:
+            known.update(model.objects.filter(
+                **{f'{field}__in': missing}).values_list(field, 'pk'))
+            missing -= set(known)
+        if missing and self.create_missing:
+            model.objects.bulk_create(
+                self._new(model, value) for value in missing)
+            known.update(model.objects.filter(
+                **{f'{field}__in': missing}).values_list(field, 'pk'))
+        return known
+
+    @staticmethod
+    def _new(model, value):
+        if model is User:
+            return User(username=value, password=make_password(None))
+        return Group(slug=value, title=value)
+
+    @staticmethod
+    def _lookup(known, value, label):
+        if value not in known:
+            raise RowError(f'{label} {value} не найден')
+        return known[value]
+
+    @staticmethod
+    def _date(value):
+        if not value:
+            return timezone.now()
+        date = parse_datetime(value)
+        if date is None:
+            raise RowError(f'некорректная дата {value}')
+        if timezone.is_naive(date):
+            date = timezone.make_aware(date)
+        return date
+
+    def _attach_images(self, posts, images):
+        paths = [os.path.join(self.images or '', image)
+                 for _, image in images if image]
+        if not paths:
+            return posts
+        copied = (self.executor.map(copy_image, paths) if self.executor
+                  else map(copy_image, paths))
+        kept = []
+        for post, (number, image) in zip(posts, images):
+            if image:
+                name, error = next(copied)
+                if error:
+                    self.skip(number, error)
+                    continue
+                post.image = name
+            kept.append(post)
+        return kept
+
+    @contextmanager
+    def _executor(self):
+        if not self.workers:
+            yield None
+            return
+        with ProcessPoolExecutor(max_workers=self.workers,
+                                 initializer=django.setup) as executor:
+            yield executor
@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+ROW = '{:<32} {:>6} {:>9} {:>9} {:>9} {:>8} {:>8} {:>9} {:>9}'
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку, пропускную способность, SQL и рендеринг '
+            'каждой страницы posts на данных из gendata. Результат '
+            'сохраняется в JSON и сравнивается с базовым прогоном.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Замеряемых запросов на страницу.')
+        parser.add_argument('--warmup', type=int, default=1)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом.')
+        parser.add_argument(
+            '--only', nargs='+', metavar='NAME',
+            help='Только страницы с этими именами из posts.urls.')
+        parser.add_argument('-o', '--output', help='Сохранить отчет JSON.')
+        parser.add_argument('--compare', metavar='BASELINE',
+                            help='Сравнить с сохраненным отчетом.')
+        parser.add_argument(
+            '--threshold', type=float, default=10,
+            help='Рост метрики в процентах, считающийся регрессией.')
+        parser.add_argument(
+            '--fail-on-regression', action='store_true',
+            help='Завершиться с ошибкой при регрессии.')
+
+    def handle(self, *args, **options):
+        baseline = (benchmark.load(options['compare'])
+                    if options['compare'] else None)
+        self.stdout.write(ROW.format(
+            'страница', 'код', 'p50 мс', 'p95 мс', 'p99 мс', 'rps',
+            'SQL', 'SQL мс', 'шабл. мс'))
+        try:
+            report = benchmark.run(
+                requests=options['requests'], warmup=options['warmup'],
+                cold=options['cold'], only=options['only'],
+                progress=self.progress)
+        except LookupError as exc:
+            raise CommandError(exc)
+        if options['output']:
+            benchmark.save(report, options['output'])
+            self.stdout.write(f'Отчет сохранен в {options["output"]}')
+        if baseline is not None:
+            self.report_changes(report, baseline, options)
+
+    def progress(self, key, result):
+        self.stdout.write(ROW.format(
+            key, result['status'], result['p50_ms'], result['p95_ms'],
+            result['p99_ms'], result['rps'], result['queries'],
+            result['sql_ms'], result['render_ms']))
+
+    def report_changes(self, report, baseline, options):
+        rows, regressions = benchmark.compare(
+            report, baseline, options['threshold'] / 100)
+        self.stdout.write(
+            f'Сравнение с {baseline["meta"].get("commit") or "базой"}:')
+        for key, metric, old, new, change in rows:
+            if abs(change) * 100 >= options['threshold']:
+                self.stdout.write(
+                    f'{key:<32} {metric:<10} {old} -> {new} '
+                    f'({change:+.0%})')
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
+            return
+        message = f'Регрессий: {len(regressions)}'
+        if options['fail_on_regression']:
+            raise CommandError(message)
+        self.stdout.write(self.style.WARNING(message))
@@ -0,0 +1,70 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import (BATCH_SIZE, FORMATS, KINDS, Importer,
+                            read_rows)
+
+# Как часто (в пачках) выводить прогресс.
+PROGRESS_EVERY = 10
+
+
+class Command(BaseCommand):
+    help = ('Загружает посты, комментарии или подписки из JSONL или CSV '
+            'пачками bulk_create. Порядок загрузки: posts, comments, '
+            'follows.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=KINDS)
+        parser.add_argument('path', help='Файл или - для stdin.')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат файла; по умолчанию по расширению.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--images', metavar='DIR',
+            help='Каталог, относительно которого указаны картинки постов.')
+        parser.add_argument(
+            '--workers', type=int, default=0,
+            help='Процессов для копирования картинок; 0 -- без пула.')
+        parser.add_argument(
+            '--create-missing', action='store_true',
+            help='Создавать неизвестных пользователей и группы.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl')
+        importer = Importer(
+            options['kind'],
+            images=options['images'],
+            workers=options['workers'],
+            create_missing=options['create_missing'],
+            batch_size=options['batch_size'],
+            progress=self.progress,
+        )
+        self.batches = 0
+        try:
+            stream = (sys.stdin if path == '-'
+                      else open(path, encoding='utf-8', newline=''))
+        except OSError as exc:
+            raise CommandError(f'{path}: {exc.strerror}')
+        with stream:
+            importer.run(read_rows(stream, fmt))
+        for error in importer.errors:
+            self.stderr.write(error)
+        authors, posts = importer.finish()
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено: {importer.imported}, пропущено: '
+            f'{importer.skipped}, {importer.rate:.0f} строк/с. '
+            f'Исправлено счетчиков авторов: {authors}, постов: {posts}'
+        ))
+        if options['kind'] == 'posts':
+            self.stdout.write(
+                'Миниатюры картинок создаст команда thumbnails.')
+
+    def progress(self, importer):
+        self.batches += 1
+        if self.batches % PROGRESS_EVERY == 0:
+            self.stdout.write(
+                f'{importer.imported} строк, {importer.rate:.0f} строк/с')
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post, make_excerpt
+
+BATCH_SIZE = 1000
+
+
+def fill_excerpts(posts, batch_size=BATCH_SIZE):
+    """Заполняет начало текста и длину постов выборки пачками по ключу.
+
+    Пишет поля напрямую, без ``Post.fill_excerpt``, поэтому годится и
+    для исторической модели в миграции. Возвращает число постов.
+    """
+    posts = posts.only('id', 'text').order_by('pk')
+    filled = 0
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        for post in batch:
+            post.excerpt = make_excerpt(post.text)
+            post.text_length = len(post.text)
+        posts.model.objects.bulk_update(batch, ['excerpt', 'text_length'])
+        filled += len(batch)
+        last_pk = batch[-1].pk
+    return filled
+
+
+class Command(BaseCommand):
+    help = ('Заполняет начало текста и длину постов, сохраненных в обход '
+            'Post.save (queryset.update, правки в базе, старые данные).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересчитать все посты, например после смены '
+                 'EXCERPT_LENGTH.')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.all()
+        if not options['all']:
+            posts = posts.filter(text_length=0).exclude(text='')
+        filled = fill_excerpts(posts)
+        self.stdout.write(self.style.SUCCESS(
+            f'Заполнено начал текста: {filled}'
+        ))
@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+from posts.models import Group, User
+
+
+class Command(BaseCommand):
+    help = ('Выгружает посты и комментарии автора или группы в NDJSON '
+            'или zip-архив с картинками, не загружая их в память.')
+
+    def add_arguments(self, parser):
+        scope = parser.add_mutually_exclusive_group(required=True)
+        scope.add_argument('--author', metavar='USERNAME')
+        scope.add_argument('--group', metavar='SLUG')
+        parser.add_argument('--format', choices=export.FORMATS,
+                            default=export.NDJSON)
+        parser.add_argument('-o', '--output',
+                            help='Файл; по умолчанию stdout.')
+
+    def handle(self, *args, **options):
+        if options['author']:
+            owner = User.objects.filter(username=options['author']).first()
+            scope = owner and export.author_scope(owner)
+        else:
+            owner = Group.objects.filter(slug=options['group']).first()
+            scope = owner and export.group_scope(owner)
+        if owner is None:
+            raise CommandError('Автор или группа не найдены')
+        output = (open(options['output'], 'wb') if options['output']
+                  else sys.stdout.buffer)
+        try:
+            for chunk in export.stream(scope, options['format']):
+                output.write(chunk)
+        finally:
+            if options['output']:
+                output.close()
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from posts.dataset import PASSWORD, Dataset
+
+# Как часто (в пачках) выводить прогресс.
+PROGRESS_EVERY = 10
+
+
+class Command(BaseCommand):
+    help = ('Создает синтетические данные для проверок производительности: '
+            'пользователей, подписки, группы, посты и комментарии. '
+            f'Пароль всех пользователей -- {PASSWORD}.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=20,
+                            help='Среднее число подписок пользователя.')
+        parser.add_argument('--years', type=int, default=3,
+                            help='За сколько лет распределены посты.')
+        parser.add_argument('--images', type=float, default=0.0,
+                            help='Доля постов с картинками, от 0 до 1.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        options = {name: options[name] for name in (
+            'users', 'groups', 'posts', 'comments', 'follows', 'years',
+            'images', 'seed')}
+        self.batches = 0
+        dataset = Dataset(progress=self.progress, **options)
+        for importer in dataset.generate():
+            self.stdout.write(self.style.SUCCESS(
+                f'{importer.kind}: {importer.imported}, '
+                f'{importer.rate:.0f} строк/с'
+            ))
+            for error in importer.errors:
+                self.stderr.write(error)
+        if options['images']:
+            self.stdout.write(
+                'Миниатюры картинок создаст команда thumbnails.')
+
+    def progress(self, importer):
+        self.batches += 1
+        if self.batches % PROGRESS_EVERY == 0:
+            self.stdout.write(f'{importer.kind}: {importer.imported}')
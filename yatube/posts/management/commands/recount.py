@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount
+
+
+class Command(BaseCommand):
+    help = ('Сверяет денормализованные счетчики постов, комментариев и '
+            'подписок с данными и исправляет расхождения.')
+
+    def handle(self, *args, **options):
+        authors, posts = recount()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счетчиков авторов: {authors}, постов: {posts}'
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Создает недостающие миниатюры и варианты картинок постов, '
+            'например для постов, загруженных до фоновой генерации.')
+
+    def handle(self, *args, **options):
+        images = Post.objects.exclude(image='').order_by().values_list(
+            'image', 'image_variants').distinct()
+        created = 0
+        for name, image_variants in images.iterator():
+            if image_variants and all(
+                    thumbnails.lookup(name, size)
+                    for size in thumbnails.GEOMETRIES):
+                continue
+            thumbnails.generate(name)
+            created += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Созданы миниатюры для картинок: {created}'
+        ))
@@ -0,0 +1,14 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:59
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_auto_20220929_1545'),
+        ('posts', '0012_auto_20220929_1550'),
+    ]
+
+    operations = [
+    ]
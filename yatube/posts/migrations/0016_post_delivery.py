@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='audience',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Подписчиков при публикации'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='delivery',
+            field=models.CharField(choices=[('push', 'Рассылка при публикации'), ('pull', 'Подмешивание при чтении')], default='push', editable=False, max_length=4, verbose_name='Доставка в ленты'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['delivery', 'author', '-pub_date'], name='posts_post_deliver_85ef95_idx'),
+        ),
+    ]
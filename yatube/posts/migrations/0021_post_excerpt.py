@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:23
+
+from django.db import migrations, models
+
+from posts.management.commands.excerpts import fill_excerpts
+
+
+def fill_post_excerpts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    fill_excerpts(Post.objects.exclude(text=''))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_comment_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', editable=False, max_length=301, verbose_name='Начало текста'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_length',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Длина текста'),
+        ),
+        migrations.RunPython(fill_post_excerpts, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,30 @@
+import json
 from tokenize import Comment
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from core.storage import HashedFileSystemStorage
+
 User = get_user_model()
 
+# Длина начала текста, которое выводится в карточках лент.
+EXCERPT_LENGTH = 300
+
+
+def make_excerpt(text):
+    """Начало текста для карточек лент.
+
+    Текст обрезается по границе слова, если она не слишком далеко
+    от EXCERPT_LENGTH.
+    """
+    if len(text) <= EXCERPT_LENGTH:
+        return text
+    excerpt = text[:EXCERPT_LENGTH]
+    space = excerpt.rfind(' ')
+    if space > EXCERPT_LENGTH // 2:
+        excerpt = excerpt[:space]
+    return excerpt.rstrip() + '…'
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
@@ -14,7 +35,50 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    """Выборки постов под конкретные страницы.
+
+    Автор и группа приходят одним join, а поля, которые страница не
+    выводит (служебные поля доставки, пароль автора и т. п.), не читаются.
+    """
+
+    FEED_FIELDS = (
+        'excerpt', 'text_length', 'pub_date', 'image', 'image_variants',
+        'comments_count', 'author', 'author__username',
+        'author__first_name', 'author__last_name', 'group', 'group__slug',
+        'group__title',
+    )
+
+    def for_feed(self):
+        """Карточки постов в лентах, поиске и профиле: без полного текста."""
+        return self.select_related('author', 'group').only(*self.FEED_FIELDS)
+
+    def for_detail(self):
+        """Страница поста: полный текст и счетчики автора."""
+        return self.select_related('author__stats', 'group').only(
+            *self.FEED_FIELDS, 'text', 'author__stats__posts_count')
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create не отправляет pre_save: начало текста заполняется здесь.
+        objs = list(objs)
+        for obj in objs:
+            obj.fill_excerpt()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def for_admin(self):
+        """Список постов в админке, без JSON вариантов картинки."""
+        return self.select_related('author', 'group').defer(
+            'image_variants')
+
+
 class Post(models.Model):
+    PUSH = 'push'
+    PULL = 'pull'
+    DELIVERY_CHOICES = (
+        (PUSH, 'Рассылка при публикации'),
+        (PULL, 'Подмешивание при чтении'),
+    )
+
     text = models.TextField()
     group = models.ForeignKey(
         Group,
@@ -32,14 +96,76 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=HashedFileSystemStorage(),
         blank=True
     )
+    delivery = models.CharField(
+        'Доставка в ленты',
+        max_length=4,
+        choices=DELIVERY_CHOICES,
+        default=PUSH,
+        editable=False
+    )
+    audience = models.PositiveIntegerField(
+        'Подписчиков при публикации',
+        default=0,
+        editable=False
+    )
+    comments_count = models.IntegerField(
+        'Комментариев',
+        default=0,
+        editable=False
+    )
+    image_variants = models.TextField(
+        'Варианты картинки',
+        blank=True,
+        default='',
+        editable=False
+    )
+    excerpt = models.CharField(
+        'Начало текста',
+        max_length=EXCERPT_LENGTH + 1,
+        blank=True,
+        default='',
+        editable=False
+    )
+    text_length = models.PositiveIntegerField(
+        'Длина текста',
+        default=0,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return self.text[:15]
 
+    @property
+    def is_truncated(self):
+        # Длину excerpt сравнивать нельзя: многоточие добавляет символ.
+        return self.text_length > EXCERPT_LENGTH
+
+    def fill_excerpt(self):
+        """Заполняет начало текста и длину по полному тексту."""
+        if 'text' in self.get_deferred_fields():
+            return
+        self.excerpt = make_excerpt(self.text)
+        self.text_length = len(self.text)
+
+    @property
+    def variants(self):
+        """Размеры и файлы вариантов картинки (см. posts.variants)."""
+        if not self.image_variants:
+            return {}
+        return json.loads(self.image_variants)
+
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['group', '-pub_date']),
+            models.Index(fields=['author', '-pub_date']),
+            models.Index(fields=['delivery', 'author', '-pub_date']),
+        ]
 
 
 class Comment(models.Model):
@@ -55,6 +181,11 @@ class Comment(models.Model):
     def __str__(self):
         return self.text
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created', 'id']),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(User,
@@ -65,3 +196,46 @@ class Follow(models.Model):
                                on_delete=models.CASCADE,
                                related_name='following',
                                verbose_name='Автор')
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счетчики пользователя.
+
+    Поддерживаются сигналами при создании и удалении постов и подписок;
+    накопившиеся расхождения исправляет команда ``recount``.
+    """
+    author = models.OneToOneField(User,
+                                  on_delete=models.CASCADE,
+                                  primary_key=True,
+                                  related_name='stats')
+    posts_count = models.IntegerField('Постов', default=0)
+    followers_count = models.IntegerField('Подписчиков', default=0)
+    following_count = models.IntegerField('Подписок', default=0)
+
+    def __str__(self):
+        return str(self.author)
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя.
+
+    Заполняется при публикации поста, поэтому страница ленты читается
+    одним диапазоном по индексу (user, pub_date) без join через Follow.
+    """
+    user = models.ForeignKey(User,
+                             on_delete=models.CASCADE,
+                             related_name='timeline')
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='timeline_entries')
+    author = models.ForeignKey(User,
+                               on_delete=models.CASCADE,
+                               related_name='+')
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post']),
+            models.Index(fields=['user', 'author']),
+        ]
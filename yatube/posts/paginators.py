@@ -0,0 +1,174 @@
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
+FEED_ORDERING = ('-pub_date', '-id')
+
+
+def encode_cursor(values):
+    """Упаковывает значения полей сортировки в непрозрачный токен."""
+    raw = json.dumps(values, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен; для битого токена возвращает None."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+class CursorPaginator(Paginator):
+    """Пагинация по ключу (keyset) вместо OFFSET.
+
+    Страница выбирается условием по полям сортировки относительно
+    токена ``after``/``before``, поэтому глубокие страницы стоят столько
+    же, сколько первая, а запрос COUNT(*) не выполняется.
+    """
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING):
+        super().__init__(object_list, per_page)
+        self.ordering = tuple(ordering)
+
+    def _check_object_list_is_ordered(self):
+        # Порядок задает ``seek`` по ``ordering``, а не сам object_list.
+        pass
+
+    def get_page(self, after=None, before=None):
+        if before:
+            values = self._cursor_values(before)
+            if values is not None:
+                return CursorPage(self, values, reverse=True)
+        if after:
+            values = self._cursor_values(after)
+            if values is not None:
+                return CursorPage(self, values)
+        return CursorPage(self)
+
+    def cursor_for(self, obj):
+        return encode_cursor([
+            getattr(obj, name.lstrip('-')) for name in self.ordering
+        ])
+
+    def seek(self, values, reverse=False):
+        """Возвращает выборку, начинающуюся сразу за курсором.
+
+        Источник, не являющийся queryset, может реализовать собственный
+        метод ``seek(values, reverse)``, а для значений, не являющихся
+        полями модели, -- ``parse_cursor(values)``.
+        """
+        source_seek = getattr(self.object_list, 'seek', None)
+        if source_seek is not None:
+            return source_seek(values, reverse)
+        return seek(self.object_list, self.ordering, values, reverse)
+
+    def _cursor_values(self, token):
+        values = decode_cursor(token)
+        if values is None or len(values) != len(self.ordering):
+            return None
+        source_parse = getattr(self.object_list, 'parse_cursor', None)
+        if source_parse is not None:
+            return source_parse(values)
+        model = self.object_list.model
+        try:
+            return [
+                model._meta.get_field(name.lstrip('-')).to_python(value)
+                for name, value in zip(self.ordering, values)
+            ]
+        except (FieldDoesNotExist, ValidationError, TypeError, ValueError):
+            return None
+
+
+class CursorPage(Page):
+    """Страница курсорной пагинации.
+
+    Строки выбираются лениво, при первом обращении, чтобы закешированный
+    фрагмент шаблона не требовал запроса к базе.
+    """
+
+    is_cursor = True
+
+    def __init__(self, paginator, cursor=None, reverse=False):
+        self.paginator = paginator
+        self.number = None
+        self.cursor = cursor
+        self.reverse = reverse
+        self._rows = None
+        self._has_more = False
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    @property
+    def object_list(self):
+        self._fetch()
+        return self._rows
+
+    def _fetch(self):
+        if self._rows is None:
+            limit = self.paginator.per_page
+            rows = list(self.paginator.seek(self.cursor, self.reverse)
+                        [:limit + 1])
+            self._has_more = len(rows) > limit
+            rows = rows[:limit]
+            if self.reverse:
+                rows.reverse()
+            self._rows = rows
+
+    def has_next(self):
+        self._fetch()
+        return self.reverse or self._has_more
+
+    def has_previous(self):
+        self._fetch()
+        if self.reverse:
+            return self._has_more
+        return self.cursor is not None
+
+    @property
+    def next_cursor(self):
+        if self.has_next() and self.object_list:
+            return self.paginator.cursor_for(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous() and self.object_list:
+            return self.paginator.cursor_for(self.object_list[0])
+        return None
+
+
+def seek(queryset, ordering, values=None, reverse=False):
+    """Упорядочивает queryset и отбрасывает строки до курсора включительно.
+
+    Условие (a, b) < (x, y) строится с учетом направления каждого поля.
+    """
+    if reverse:
+        ordering = tuple(_invert(name) for name in ordering)
+    queryset = queryset.order_by(*ordering)
+    if values is None:
+        return queryset
+    conditions = []
+    for i, name in enumerate(ordering):
+        field = name.lstrip('-')
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        condition = {
+            other.lstrip('-'): value
+            for other, value in zip(ordering[:i], values)
+        }
+        condition[f'{field}__{lookup}'] = values[i]
+        conditions.append(Q(**condition))
+    return queryset.filter(reduce(or_, conditions))
+
+
+def _invert(name):
+    return name[1:] if name.startswith('-') else '-' + name
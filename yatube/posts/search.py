@@ -0,0 +1,166 @@
+import re
+
+from django.core.exceptions import ValidationError
+from django.db import connection, connections, transaction
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+RANK_ORDERING = ('rank', 'id')
+RECENT_ORDERING = ('-pub_date', '-id')
+MAX_TERMS = 10
+
+# Внешнее содержимое (content=...): индекс хранит только списки
+# вхождений, сам текст читается из posts_post. Триггеры держат индекс
+# в согласии с таблицей при любых изменениях, включая bulk-операции
+# и правки в обход ORM.
+SCHEMA = (
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        text, content='posts_post', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    f"""INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')""",
+)
+TRIGGERS = (
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai
+        AFTER INSERT ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad
+        AFTER DELETE ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+        AFTER UPDATE OF text ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END""",
+)
+
+
+def install(using='default', **kwargs):
+    """Создает индекс FTS5 и триггеры, если их еще нет.
+
+    Вызывается после каждого ``migrate``: SQLite пересоздает таблицу
+    posts_post при изменении ее схемы, и триггеры пропадают вместе
+    со старой таблицей. ``migrate`` другого приложения на новой базе
+    тоже вызывает его, поэтому без posts_post ничего не делается. Индекс
+    создается и заполняется в одной транзакции: таблица без 'rebuild'
+    осталась бы пустой навсегда.
+    """
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return
+    with transaction.atomic(using=using), db.cursor() as cursor:
+        tables = db.introspection.table_names(cursor)
+        if Post._meta.db_table not in tables:
+            return
+        if FTS_TABLE not in tables:
+            for statement in SCHEMA:
+                cursor.execute(statement)
+        for statement in TRIGGERS:
+            cursor.execute(statement)
+
+
+def match_expression(query):
+    """Переводит строку поиска в выражение MATCH.
+
+    Каждое слово берется в кавычки, чтобы операторы FTS5 из ввода
+    пользователя не ломали запрос; слово со звездочкой на конце ищется
+    по префиксу. Слова объединяются по И.
+    """
+    terms = re.findall(r'(\w+)(\*?)', query)[:MAX_TERMS]
+    return ' '.join(f'"{word}"{star}' for word, star in terms)
+
+
+def search(query, group_id=None, author_id=None, recent=False):
+    """Посты по строке поиска с фильтрами по группе и автору."""
+    return SearchResults(match_expression(query), group_id, author_id,
+                         recent)
+
+
+class SearchResults:
+    """Найденные посты, упорядоченные по релевантности (bm25) или по новизне.
+
+    Протокол тот же, что у ``TimelineFeed``: ``seek`` и срезы. Срез
+    выполняется двумя запросами: ключи страницы из индекса FTS5 с
+    условием по курсору и LIMIT, затем сами посты по первичному ключу.
+    """
+
+    model = Post
+
+    def __init__(self, expression, group_id=None, author_id=None,
+                 recent=False, cursor=None, reverse=False):
+        self.expression = expression
+        self.group_id = group_id
+        self.author_id = author_id
+        self.recent = recent
+        self.cursor = cursor
+        self.reverse = reverse
+
+    @property
+    def ordering(self):
+        return RECENT_ORDERING if self.recent else RANK_ORDERING
+
+    def seek(self, values, reverse=False):
+        return SearchResults(self.expression, self.group_id, self.author_id,
+                             self.recent, values, reverse)
+
+    def parse_cursor(self, values):
+        try:
+            if self.recent:
+                return [Post._meta.get_field('pub_date').to_python(values[0]),
+                        int(values[1])]
+            return [float(values[0]), int(values[1])]
+        except (TypeError, ValueError, ValidationError):
+            return None
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if not self.expression:
+            return []
+        ranks = dict(self._keys(index.start or 0, index.stop))
+        posts = Post.objects.for_feed().in_bulk(list(ranks))
+        rows = []
+        for post_id, rank in ranks.items():
+            if post_id in posts:
+                post = posts[post_id]
+                post.rank = rank
+                rows.append(post)
+        return rows
+
+    def _keys(self, start, stop):
+        where = [f'f.{FTS_TABLE} MATCH %s']
+        params = [self.expression]
+        if self.group_id is not None:
+            where.append('p.group_id = %s')
+            params.append(self.group_id)
+        if self.author_id is not None:
+            where.append('p.author_id = %s')
+            params.append(self.author_id)
+        forward = '<' if self.recent else '>'
+        if self.reverse:
+            forward = '>' if forward == '<' else '<'
+        # Ключ порядка: дата публикации (импорт ставит даты из прошлого,
+        # поэтому id не годится) или ранг; id разводит равные значения.
+        key = 'p.pub_date' if self.recent else 'f.rank'
+        if self.cursor is not None:
+            where.append(f'({key} {forward} %s '
+                         f'OR ({key} = %s AND f.rowid {forward} %s))')
+            value, post_id = self.cursor
+            if self.recent:
+                value = connection.ops.adapt_datetimefield_value(value)
+            params += [value, value, post_id]
+        direction = 'ASC' if (forward == '>') else 'DESC'
+        order = f'{key} {direction}, f.rowid {direction}'
+        limit = 'LIMIT -1' if stop is None else 'LIMIT %s'
+        params += ([] if stop is None else [stop - start]) + [start]
+        sql = (f'SELECT f.rowid, f.rank FROM {FTS_TABLE} f '
+               f'JOIN posts_post p ON p.id = f.rowid '
+               f'WHERE {" AND ".join(where)} '
+               f'ORDER BY {order} {limit} OFFSET %s')
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
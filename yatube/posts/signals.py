@@ -0,0 +1,163 @@
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from core.cache import invalidate
+
+from . import cache, counters, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, User
+
+# Поля пользователя, которые видны в карточке поста.
+CARD_USER_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(pre_save, sender=Post)
+def post_choose_delivery(sender, instance, **kwargs):
+    if instance._state.adding:
+        timeline.choose_delivery(instance)
+
+
+@receiver(pre_save, sender=Post)
+def post_fill_excerpt(sender, instance, **kwargs):
+    instance.fill_excerpt()
+
+
+@receiver(post_save, sender=Post)
+def post_fan_out(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_backfill(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def unfollow_trim(sender, instance, **kwargs):
+    timeline.trim(instance.user_id, instance.author_id)
+
+
+@receiver(post_init, sender=Post)
+def post_remember_initial(sender, instance, **kwargs):
+    # Через __dict__, чтобы не подгружать отложенные поля.
+    instance._initial_group_id = instance.__dict__.get('group_id')
+    instance._initial_image = str(instance.__dict__.get('image') or '')
+
+
+@receiver(pre_save, sender=Post)
+def post_reset_variants(sender, instance, **kwargs):
+    if ('image' in instance.__dict__
+            and instance.image.name != instance._initial_image):
+        instance.image_variants = ''
+
+
+@receiver(post_save, sender=Post)
+def post_schedule_thumbnails(sender, instance, **kwargs):
+    if 'image' not in instance.__dict__:
+        return
+    name = instance.image.name or ''
+    if name != instance._initial_image:
+        thumbnails.schedule(name)
+        instance._initial_image = name
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_invalidate(sender, instance, **kwargs):
+    group_ids = {instance.group_id, instance._initial_group_id} - {None}
+    slugs = Group.objects.filter(
+        pk__in=group_ids).values_list('slug', flat=True)
+    invalidate(
+        cache.INDEX,
+        cache.post_tag(instance.pk),
+        cache.author_tag(instance.author_id),
+        *(cache.group_tag(slug) for slug in slugs),
+    )
+    instance._initial_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_invalidate(sender, instance, **kwargs):
+    invalidate(cache.comments_tag(instance.post_id))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_invalidate(sender, instance, **kwargs):
+    invalidate(cache.INDEX, cache.GROUPS, cache.group_tag(instance.slug))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_invalidate(sender, instance, **kwargs):
+    # Профиль подписчика показывает число его подписок.
+    invalidate(cache.author_tag(instance.author_id),
+               cache.author_tag(instance.user_id))
+
+
+def card_user_fields(user):
+    # Через __dict__, чтобы не подгружать отложенные поля.
+    return {field: user.__dict__.get(field) for field in CARD_USER_FIELDS}
+
+
+@receiver(post_init, sender=User)
+def author_remember_initial(sender, instance, **kwargs):
+    instance._initial_card = card_user_fields(instance)
+
+
+@receiver(post_save, sender=User)
+def author_invalidate(sender, instance, created, update_fields=None,
+                      **kwargs):
+    # Новый пользователь еще не виден в карточках, а вход, смена пароля
+    # и прочие поля их не меняют.
+    fields = CARD_USER_FIELDS if update_fields is None else (
+        CARD_USER_FIELDS & set(update_fields))
+    card = card_user_fields(instance)
+    if not created and any(
+            card[field] != instance._initial_card[field] for field in fields):
+        invalidate(cache.INDEX, cache.AUTHORS,
+                   cache.author_tag(instance.pk))
+    instance._initial_card = card
+
+
+@receiver(post_delete, sender=User)
+def author_delete_invalidate(sender, instance, **kwargs):
+    invalidate(cache.INDEX, cache.AUTHORS, cache.author_tag(instance.pk))
+
+
+@receiver(post_save, sender=Post)
+def post_count(sender, instance, created, **kwargs):
+    if created:
+        counters.change_author(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def post_uncount(sender, instance, **kwargs):
+    counters.change_author(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_count(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_uncount(sender, instance, **kwargs):
+    counters.change_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_count(sender, instance, created, **kwargs):
+    if created:
+        counters.change_author(instance.author_id, followers_count=1)
+        counters.change_author(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_uncount(sender, instance, **kwargs):
+    counters.change_author(instance.author_id, followers_count=-1)
+    counters.change_author(instance.user_id, following_count=-1)
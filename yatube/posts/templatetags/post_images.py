@@ -0,0 +1,37 @@
+from django import template
+
+from .. import cards, thumbnails, variants
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_thumbnail(context, image, size):
+    """Готовая миниатюра картинки поста или None.
+
+    Картинка в запросе не декодируется: если миниатюры еще нет, шаблон
+    выводит заглушку, а миниатюру создает воркер.
+    """
+    prefetched = context.get(thumbnails.PREFETCHED)
+    if prefetched is not None and (image, size) in prefetched:
+        return prefetched[(image, size)]
+    return thumbnails.lookup(image, size)
+
+
+@register.simple_tag
+def post_cards(posts, template_name, size):
+    """Отрендеренные карточки постов из кеша (см. posts.cards)."""
+    return cards.render_cards(posts, template_name, size)
+
+
+@register.simple_tag
+def image_sources(post, size):
+    """Источники <picture> для картинки поста в форматах WebP/AVIF."""
+    return variants.sources(post, size)
+
+
+@register.filter
+def placeholder_style(size):
+    """Заглушка занимает место будущей миниатюры."""
+    width, height = thumbnails.GEOMETRIES[size][0].split('x')
+    return f'aspect-ratio: {width} / {height}; max-width: {width}px'
@@ -0,0 +1,139 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import EXCERPT_LENGTH, Comment, Follow, Group, Post, User
+from ..views import COMMENTS_LIMIT, LIMIT_POST
+
+
+TEST_SLUG = 'test-slug'
+TEST_USERNAME_AUTHOR = 'author'
+POSTS_COUNT = LIMIT_POST + 3
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username=TEST_USERNAME_AUTHOR, first_name='Лев',
+            last_name='Толстой')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug=TEST_SLUG, description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.posts = [
+            Post.objects.create(text=f'Пост {i} ' + 'слово ' * 100,
+                                author=cls.author, group=cls.group)
+            for i in range(POSTS_COUNT)
+        ]
+        cls.posts.reverse()
+        cls.post = cls.posts[0]
+        for i in range(COMMENTS_LIMIT + 1):
+            Comment.objects.create(post=cls.post, author=cls.reader,
+                                   text=f'Комментарий {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_feeds_paginate_by_cursor(self):
+        """Ленты отдаются страницами с курсором следующей страницы."""
+        urls = {
+            reverse('posts:api_index'): self.guest_client,
+            reverse('posts:api_group_list', args=[TEST_SLUG]):
+                self.guest_client,
+            reverse('posts:api_profile', args=[TEST_USERNAME_AUTHOR]):
+                self.guest_client,
+            reverse('posts:api_follow_index'): self.authorized_client,
+        }
+        for url, client in urls.items():
+            with self.subTest(url=url):
+                first = client.get(url).json()
+                self.assertEqual(
+                    [post['id'] for post in first['results']],
+                    [post.pk for post in self.posts[:LIMIT_POST]])
+                self.assertIsNone(first['previous'])
+                second = client.get(url, {'after': first['next']}).json()
+                self.assertEqual(
+                    [post['id'] for post in second['results']],
+                    [post.pk for post in self.posts[LIMIT_POST:]])
+                self.assertIsNone(second['next'])
+
+    def test_feed_item(self):
+        """Карточка в ленте: начало текста, автор, группа."""
+        item = self.guest_client.get(
+            reverse('posts:api_index')).json()['results'][0]
+        self.assertEqual(item['text'], self.post.excerpt)
+        self.assertLessEqual(len(item['text']), EXCERPT_LENGTH + 1)
+        self.assertTrue(item['truncated'])
+        self.assertEqual(item['author'], {'username': TEST_USERNAME_AUTHOR,
+                                          'name': 'Лев Толстой'})
+        self.assertEqual(item['group'], {'slug': TEST_SLUG,
+                                         'title': 'Тестовая группа'})
+        self.assertIsNone(item['image'])
+        self.assertNotIn('comments_count', item)
+
+    def test_comment_count_revalidated(self):
+        """Новый комментарий меняет ETag поста с числом комментариев."""
+        url = reverse('posts:api_post_detail', args=[self.post.pk])
+        response = self.guest_client.get(url)
+        self.assertEqual(response.json()['comments_count'],
+                         COMMENTS_LIMIT + 1)
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Еще комментарий')
+        response = self.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['comments_count'],
+                         COMMENTS_LIMIT + 2)
+
+    def test_feed_queries(self):
+        """Страница ленты читается одним запросом, как в HTML."""
+        with self.assertNumQueries(1):
+            self.guest_client.get(reverse('posts:api_index'))
+
+    def test_fields_selection(self):
+        """?fields= оставляет только перечисленные поля."""
+        url = reverse('posts:api_index')
+        response = self.guest_client.get(url, {'fields': 'id,pub_date'})
+        self.assertEqual(set(response.json()['results'][0]),
+                         {'id', 'pub_date'})
+        response = self.guest_client.get(url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+    def test_post_detail(self):
+        """Пост отдается с полным текстом."""
+        response = self.guest_client.get(
+            reverse('posts:api_post_detail', args=[self.post.pk]))
+        self.assertEqual(response.json()['text'], self.post.text)
+        self.assertFalse(response.json()['truncated'])
+        response = self.guest_client.get(
+            reverse('posts:api_post_detail', args=[self.post.pk + 100]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_post_comments(self):
+        """Комментарии отдаются страницами по курсору."""
+        url = reverse('posts:api_post_comments', args=[self.post.pk])
+        first = self.guest_client.get(url).json()
+        self.assertEqual(len(first['results']), COMMENTS_LIMIT)
+        self.assertEqual(first['results'][0]['author']['username'],
+                         'reader')
+        second = self.guest_client.get(url, {'after': first['next']}).json()
+        self.assertEqual(second['results'][0]['text'],
+                         f'Комментарий {COMMENTS_LIMIT}')
+
+    def test_follow_requires_login(self):
+        """Лента подписок гостю отвечает 401."""
+        response = self.guest_client.get(reverse('posts:api_follow_index'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_conditional_get(self):
+        """API поддерживает If-None-Match так же, как HTML-страницы."""
+        url = reverse('posts:api_index')
+        etag = self.guest_client.get(url)['ETag']
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
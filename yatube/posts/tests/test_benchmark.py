@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import benchmark, urls
+from ..dataset import Dataset
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Dataset(users=20, groups=3, posts=40, comments=60, follows=5,
+                seed=1).generate()
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.output = os.path.join(self.directory, 'baseline.json')
+
+    def tearDown(self):
+        if os.path.exists(self.output):
+            os.remove(self.output)
+        os.rmdir(self.directory)
+
+    def test_percentile(self):
+        """Перцентиль по ближайшему рангу."""
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([5], 95), 5)
+
+    def test_nested_renders_counted_once(self):
+        """Карточки, отрендеренные внутри страницы, не считаются дважды."""
+        cache.clear()
+        with benchmark.render_timer() as timings:
+            Client().get(reverse('posts:index'))
+        self.assertEqual(len(timings), 1)
+
+    def test_report_covers_every_page(self):
+        """Отчет содержит каждую страницу posts.urls для обоих клиентов."""
+        call_command('benchmark', requests=2, output=self.output,
+                     stdout=StringIO())
+        with open(self.output, encoding='utf-8') as file:
+            report = json.load(file)
+        names = {pattern.name for pattern in urls.urlpatterns} - (
+            benchmark.SKIP)
+        self.assertEqual(set(report['views']), {
+            f'{name} {client}' for name in names
+            for client in benchmark.CLIENTS})
+        index = report['views']['index anonymous']
+        self.assertEqual(index['status'], 200)
+        for metric in benchmark.METRICS + ('rps',):
+            self.assertIsNotNone(index[metric])
+        self.assertGreater(index['render_ms'], 0)
+        self.assertEqual(report['views']['post_edit user']['status'], 200)
+        self.assertEqual(report['meta']['dataset']['Post'], 40)
+
+    def test_cold_run_counts_queries(self):
+        """Без кеша страница выполняет запросы и рендерит шаблон."""
+        report = benchmark.run(requests=2, cold=True, only=['index'])
+        self.assertGreater(report['views']['index anonymous']['queries'], 0)
+
+    def test_compare_flags_regressions(self):
+        """Рост метрики выше порога считается регрессией."""
+        report = benchmark.run(requests=1, only=['index'])
+        benchmark.save(report, self.output)
+        slower = json.loads(json.dumps(report))
+        slower['views']['index anonymous']['queries'] += 10
+        _, regressions = benchmark.compare(slower, report)
+        self.assertEqual([row[:2] for row in regressions],
+                         [('index anonymous', 'queries')])
+        with self.assertRaises(CommandError):
+            call_command('benchmark', requests=1, only=['index'],
+                         compare=self.output, threshold=-100,
+                         fail_on_regression=True, stdout=StringIO())
@@ -0,0 +1,120 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import resolve, reverse
+
+from core.budgets import budget_for, count_queries
+from core.middleware import QUERY_COUNT_HEADER
+
+from .. import benchmark, views
+from ..models import Comment, Follow, Group, Post, User
+
+SIZES = (1, 10)
+
+
+class QueryBudgetTests(TestCase):
+    def populate(self, size):
+        """Страницы из ``size`` постов и комментариев разных авторов."""
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        group = Group.objects.create(slug='group', title='Группа')
+        viewer = User.objects.create_user('viewer', is_staff=True)
+        posts = []
+        for n in range(size):
+            author = User.objects.create_user(f'author{n}')
+            Post.objects.create(text=f'Текст поста {n}', author=author,
+                                group=group)
+            Follow.objects.create(user=viewer, author=author)
+            posts.append(Post.objects.create(
+                text=f'Текст записи {n}', author=viewer, group=group))
+            Comment.objects.create(post=posts[0], author=author,
+                                   text=f'Комментарий {n}')
+        kwargs = {'slug': group.slug, 'username': viewer.username,
+                  'post_id': posts[0].pk}
+        query = {'search': {'q': 'текст'},
+                 'profile_export': {'format': 'ndjson'}}
+        return viewer, kwargs, query
+
+    def counts(self, size):
+        """{(страница, клиент): (число запросов, бюджет)} без кеша."""
+        viewer, kwargs, query = self.populate(size)
+        clients = {'anonymous': Client(), 'user': Client()}
+        clients['user'].force_login(viewer)
+        counts = {}
+        with benchmark.quiet_requests():
+            for name, url in benchmark.pages(kwargs, query):
+                budget = budget_for(resolve(url.split('?')[0]).func)
+                for client_name, client in clients.items():
+                    cache.clear()
+                    with count_queries() as queries:
+                        benchmark._get(client, url)
+                    counts[name, client_name] = (len(queries), budget)
+        return counts
+
+    def action_counts(self, size):
+        """{действие: (число запросов, бюджет)} вошедшего пользователя."""
+        viewer, kwargs, _ = self.populate(size)
+        client = Client()
+        client.force_login(viewer)
+        author = User.objects.get(username='author0')
+        # Отписка идет раньше подписки, чтобы та создала Follow заново.
+        actions = {
+            'add_comment': ({'post_id': kwargs['post_id']},
+                            {'text': 'Новый комментарий'}),
+            'profile_unfollow': ({'username': author.username}, None),
+            'profile_follow': ({'username': author.username}, None),
+        }
+        counts = {}
+        for name, (args, data) in actions.items():
+            url = reverse(f'posts:{name}', kwargs=args)
+            budget = budget_for(resolve(url).func)
+            cache.clear()
+            with count_queries() as queries:
+                if data is None:
+                    response = client.get(url)
+                else:
+                    response = client.post(url, data)
+            self.assertEqual(response.status_code, 302)
+            counts[name] = (len(queries), budget)
+        self.assertEqual(set(counts), benchmark.SKIP)
+        return counts
+
+    def test_actions_fit_budgets(self):
+        """Действия вне нагрузочного прогона тоже укладываются в бюджет."""
+        small, large = (self.action_counts(size) for size in SIZES)
+        for name, (queries, budget) in large.items():
+            with self.subTest(action=name):
+                self.assertIsNotNone(budget, 'бюджет не объявлен')
+                self.assertLessEqual(queries, budget)
+                self.assertEqual(queries, small[name][0])
+
+    def test_pages_fit_budgets(self):
+        """Страницы укладываются в бюджет при любом размере страницы."""
+        small, large = (self.counts(size) for size in SIZES)
+        for key, (queries, budget) in large.items():
+            with self.subTest(page=key):
+                self.assertIsNotNone(budget, 'бюджет не объявлен')
+                self.assertLessEqual(queries, budget)
+                self.assertEqual(queries, small[key][0])
+
+    @override_settings(DEBUG=True)
+    def test_middleware_reports_queries(self):
+        """При DEBUG число запросов отдается в заголовке."""
+        response = Client().get('/')
+        self.assertIn(QUERY_COUNT_HEADER, response)
+        self.assertLessEqual(int(response[QUERY_COUNT_HEADER]),
+                             budget_for(views.index))
+
+    @override_settings(DEBUG=True)
+    def test_middleware_warns_over_budget(self):
+        """Превышение бюджета попадает в лог core.budgets."""
+        with mock.patch.object(views.index, 'query_budget', 0):
+            with self.assertLogs('core.budgets', 'WARNING') as logs:
+                Client().get('/')
+        self.assertIn('posts:index', logs.output[0])
+
+    def test_middleware_disabled_without_debug(self):
+        """Без DEBUG запросы не считаются."""
+        response = Client().get('/')
+        self.assertNotIn(QUERY_COUNT_HEADER, response)
@@ -0,0 +1,186 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.cache import invalidate, tags_version, tags_versions
+from .. import cards
+from ..cache import AUTHORS, INDEX
+from ..models import Comment, Follow, Group, Post, User
+
+
+TEST_TITLE = 'Тестовая группа'
+TEST_SLUG = 'test-slug'
+TEST_SLUG_2 = 'test-slug-2'
+TEST_TEXT = 'Тестовый пост'
+TEST_USERNAME_AUTHOR = 'author'
+TEST_USERNAME_USER = 'reader'
+
+
+class TagsVersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_invalidate_changes_only_dependent_versions(self):
+        """Сброс тега меняет версию только зависящих от него наборов."""
+        both = tags_version('a', 'b')
+        only_b = tags_version('b')
+        invalidate('a')
+        self.assertNotEqual(tags_version('a', 'b'), both)
+        self.assertEqual(tags_version('b'), only_b)
+
+    def test_version_survives_eviction(self):
+        """После вытеснения счетчика версия не совпадает со старой."""
+        version = tags_version('a')
+        cache.delete('tag:a')
+        self.assertNotEqual(tags_version('a'), version)
+
+    def test_many_versions_match_single(self):
+        """Версии нескольких наборов совпадают с прочитанными по одному."""
+        self.assertEqual(tags_versions([('a', 'b'), ('b',)]),
+                         [tags_version('a', 'b'), tags_version('b')])
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+    def test_cache_that_keeps_nothing(self):
+        """Без сохраненных счетчиков версии есть, а страницы работают."""
+        self.assertTrue(tags_version('a', 'b'))
+        self.assertEqual(Client().get(reverse('posts:index')).status_code,
+                         200)
+
+
+class TaggedPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=TEST_USERNAME_AUTHOR)
+        cls.reader = User.objects.create_user(username=TEST_USERNAME_USER)
+        cls.group = Group.objects.create(title=TEST_TITLE, slug=TEST_SLUG)
+        cls.group2 = Group.objects.create(title=TEST_TITLE, slug=TEST_SLUG_2)
+        cls.post = Post.objects.create(
+            text=TEST_TEXT, author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.group_url = reverse('posts:group_list', args=[TEST_SLUG])
+        self.profile_url = reverse('posts:profile', args=[self.author])
+        self.detail_url = reverse('posts:post_detail', args=[self.post.pk])
+
+    def test_pages_served_from_cache(self):
+        """Без событий страницы отдаются из кеша."""
+        urls = (self.group_url, self.profile_url, self.detail_url)
+        for url in urls:
+            self.guest_client.get(url)
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertNotContains(response, 'Тихая правка')
+
+    def test_post_edit_invalidates_dependent_pages(self):
+        """Правка поста сбрасывает группу, профиль и страницу поста."""
+        urls = (self.group_url, self.profile_url, self.detail_url)
+        for url in urls:
+            self.guest_client.get(url)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertContains(response, 'Новый текст')
+
+    def test_group_change_invalidates_old_group(self):
+        """Перенос поста в другую группу убирает его из старой."""
+        post = Post.objects.create(
+            text='Переезжающий пост', author=self.author, group=self.group)
+        self.guest_client.get(self.group_url)
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.group2
+        post.save()
+        response = self.guest_client.get(self.group_url)
+        self.assertNotContains(response, 'Переезжающий пост')
+
+    def test_comment_invalidates_post_detail(self):
+        """Новый комментарий сразу виден на странице поста."""
+        self.guest_client.get(self.detail_url)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Свежий комментарий')
+        response = self.guest_client.get(self.detail_url)
+        self.assertContains(response, 'Свежий комментарий')
+
+    def test_unrelated_events_keep_cache(self):
+        """События чужих тегов не сбрасывают страницу группы."""
+        response = self.guest_client.get(self.group_url)
+        version = response.context['cache_version']
+        Follow.objects.create(user=self.reader, author=self.author)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий')
+        response = self.guest_client.get(self.group_url)
+        self.assertEqual(response.context['cache_version'], version)
+
+
+class PostCardsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=TEST_USERNAME_AUTHOR)
+        cls.reader = User.objects.create_user(username=TEST_USERNAME_USER)
+        cls.group = Group.objects.create(title=TEST_TITLE, slug=TEST_SLUG)
+        cls.post = Post.objects.create(
+            text=TEST_TEXT, author=cls.author, group=cls.group)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.follow_url = reverse('posts:follow_index')
+
+    def test_card_shared_between_pages(self):
+        """Карточка, отрендеренная для главной, выводится в ленте."""
+        Client().get(reverse('posts:index'))
+        Post.objects.filter(pk=self.post.pk).update(excerpt='Тихая правка')
+        response = self.reader_client.get(self.follow_url)
+        self.assertContains(response, TEST_TEXT)
+        self.assertNotContains(response, 'Тихая правка')
+
+    def test_post_edit_refreshes_card(self):
+        """Правка поста меняет версию его карточки."""
+        self.reader_client.get(self.follow_url)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        response = self.reader_client.get(self.follow_url)
+        self.assertContains(response, 'Новый текст')
+
+    def test_author_rename_refreshes_card(self):
+        """Новое имя автора попадает в карточки."""
+        self.reader_client.get(self.follow_url)
+        self.author.first_name = 'Лев'
+        self.author.save()
+        response = self.reader_client.get(self.follow_url)
+        self.assertContains(response, 'Лев')
+
+    def test_user_saves_without_card_changes_keep_pages(self):
+        """Регистрация и смена пароля не сбрасывают кеш карточек."""
+        version = tags_version(INDEX, AUTHORS)
+        user = User.objects.create_user('newcomer')
+        user.set_password('секрет')
+        user.save()
+        self.author.save()
+        self.assertEqual(tags_version(INDEX, AUTHORS), version)
+        user.last_name = 'Новиков'
+        user.save()
+        self.assertNotEqual(tags_version(INDEX, AUTHORS), version)
+
+    def test_cached_cards_not_rendered(self):
+        """Закешированные карточки читаются без рендеринга шаблона."""
+        template = 'posts/includes/body_post.html'
+        posts = list(Post.objects.for_feed())
+        first = cards.render_cards(posts, template, 'card')
+        with mock.patch.object(cards, 'get_template') as get_template:
+            second = cards.render_cards(posts, template, 'card')
+        get_template.assert_not_called()
+        self.assertEqual(first, second)
+        self.assertIn(TEST_TEXT, first[0])
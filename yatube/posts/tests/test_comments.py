@@ -0,0 +1,83 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post, User
+from ..views import COMMENTS_LIMIT, comments_page
+
+
+TEST_TEXT = 'Тестовый пост'
+TEST_USERNAME_AUTHOR = 'author'
+
+
+class CommentPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=TEST_USERNAME_AUTHOR)
+        cls.readers = [
+            User.objects.create_user(username=f'reader{i}') for i in range(3)
+        ]
+        cls.post = Post.objects.create(text=TEST_TEXT, author=cls.author)
+        cls.comments = [
+            Comment.objects.create(post=cls.post, author=cls.readers[i % 3],
+                                   text=f'Комментарий {i}')
+            for i in range(COMMENTS_LIMIT * 2 + 5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.detail_url = reverse('posts:post_detail', args=[self.post.pk])
+
+    def test_first_page_in_one_query(self):
+        """Страница комментариев с авторами читается одним запросом."""
+        response = self.guest_client.get(self.detail_url)
+        self.assertEqual(list(response.context['comments']),
+                         self.comments[:COMMENTS_LIMIT])
+        page = comments_page(self.post.pk)
+        with self.assertNumQueries(1):
+            [comment.author.username for comment in page]
+
+    def test_load_more_walks_all_comments(self):
+        """«Показать еще» по курсору отдает все комментарии по порядку."""
+        response = self.guest_client.get(self.detail_url)
+        seen = list(response.context['comments'])
+        cursor = response.context['comments'].next_cursor
+        while cursor:
+            response = self.guest_client.get(
+                reverse('posts:post_comments', args=[self.post.pk]),
+                {'after': cursor})
+            self.assertTemplateUsed(
+                response, 'posts/includes/comment_list.html')
+            seen += list(response.context['comments'])
+            cursor = response.context['comments'].next_cursor
+        self.assertEqual(seen, self.comments)
+        self.assertNotContains(response, 'Показать еще')
+
+    def test_new_comment_resets_cached_pages(self):
+        """Новый комментарий виден на последней странице подгрузки."""
+        first = self.guest_client.get(self.detail_url).context['comments']
+        url = reverse('posts:post_comments', args=[self.post.pk])
+        params = {'after': first.next_cursor}
+        second = self.guest_client.get(url, params).context['comments']
+        last_url = f'{url}?after={second.next_cursor}'
+        self.guest_client.get(last_url)
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Свежий комментарий')
+        self.assertContains(self.guest_client.get(last_url),
+                            'Свежий комментарий')
+
+    def test_commenter_rename_resets_cached_pages(self):
+        """Новое имя комментатора видно на странице поста и в подгрузке."""
+        url = reverse('posts:post_comments', args=[self.post.pk])
+        first = self.guest_client.get(self.detail_url).context['comments']
+        params = {'after': first.next_cursor}
+        self.guest_client.get(url, params)
+        reader = User.objects.get(pk=self.readers[0].pk)
+        reader.username = 'renamed'
+        reader.save()
+        for response in (self.guest_client.get(self.detail_url),
+                         self.guest_client.get(url, params)):
+            self.assertContains(response, '/profile/renamed/')
+            self.assertNotContains(response, '/profile/reader0/')
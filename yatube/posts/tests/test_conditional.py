@@ -0,0 +1,107 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.cache import VERSION_KEY
+
+from ..cache import group_tag
+from ..models import Comment, Follow, Group, Post, User
+
+
+TEST_TEXT = 'Тестовый пост'
+TEST_SLUG = 'test-slug'
+TEST_USERNAME_AUTHOR = 'author'
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=TEST_USERNAME_AUTHOR)
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug=TEST_SLUG, description='Описание')
+        cls.post = Post.objects.create(
+            text=TEST_TEXT, author=cls.author, group=cls.group)
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[TEST_SLUG]),
+            reverse('posts:profile', args=[TEST_USERNAME_AUTHOR]),
+            reverse('posts:post_detail', args=[cls.post.pk]),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def revalidate(self, url, client=None):
+        client = client or self.guest_client
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_page_not_modified(self):
+        """Неизменившаяся страница отдает 304 без запроса постов."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                with self.assertNumQueries(0 if url == '/' else 1):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_new_post_changes_etag(self):
+        """Новый пост меняет ETag ленты, группы и профиля."""
+        etags = {url: self.guest_client.get(url)['ETag']
+                 for url in self.urls[:3]}
+        Post.objects.create(text=TEST_TEXT, author=self.author,
+                            group=self.group)
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url,
+                                                 HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_follow_changes_follower_profile_etag(self):
+        """Подписка меняет ETag профиля подписчика: в нем число подписок."""
+        url = reverse('posts:profile', args=[self.reader.username])
+        etag = self.guest_client.get(url)['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_group_has_no_version(self):
+        """Для несуществующей группы версия тега в кеше не заводится."""
+        response = self.guest_client.get(
+            reverse('posts:group_list', args=['missing']))
+        self.assertEqual(response.status_code, 404)
+        self.assertIsNone(cache.get(VERSION_KEY.format(
+            group_tag('missing'))))
+
+    def test_comment_changes_detail_etag(self):
+        """Новый комментарий меняет ETag страницы поста."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        etag = self.guest_client.get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Комментарий')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        """Страница, отданная гостю, не подходит вошедшему пользователю."""
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.revalidate(url, client).status_code, 304)
+
+    def test_missing_pages_not_found(self):
+        """Для несуществующего автора и поста ETag не считается."""
+        for url in (reverse('posts:profile', args=['nobody']),
+                    reverse('posts:post_detail', args=[self.post.pk + 1])):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertFalse(response.has_header('ETag'))
@@ -0,0 +1,96 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import AuthorStats, Comment, Follow, Post, User
+
+
+TEST_TEXT = 'Тестовый пост'
+TEST_USERNAME_AUTHOR = 'author'
+TEST_USERNAME_USER = 'reader'
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=TEST_USERNAME_AUTHOR)
+        cls.reader = User.objects.create_user(username=TEST_USERNAME_USER)
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def stats(self, user):
+        return AuthorStats.objects.get(author=user)
+
+    def test_counters_follow_changes(self):
+        """Счетчики меняются при создании и удалении записей."""
+        post = Post.objects.create(text=TEST_TEXT, author=self.author)
+        Post.objects.create(text=TEST_TEXT, author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text=TEST_TEXT)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.assertEqual(Post.objects.get(pk=post.pk).comments_count, 1)
+
+        comment.delete()
+        follow.delete()
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_recount_fixes_drift(self):
+        """Команда recount исправляет разошедшиеся счетчики."""
+        post = Post.objects.create(text=TEST_TEXT, author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text=TEST_TEXT)
+        AuthorStats.objects.filter(author=self.author).update(posts_count=9)
+        AuthorStats.objects.filter(author=self.reader).delete()
+        Post.objects.update(comments_count=0)
+        call_command('recount', stdout=StringIO())
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.reader).posts_count, 0)
+        self.assertEqual(Post.objects.get(pk=post.pk).comments_count, 1)
+
+    def test_recount_invalidates_pages(self):
+        """После recount профиль и пост показывают верные счетчики."""
+        post = Post.objects.create(text=TEST_TEXT, author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text=TEST_TEXT)
+        AuthorStats.objects.filter(author=self.author).update(posts_count=9)
+        Post.objects.update(comments_count=5)
+        client = self.guest_client
+        urls = (reverse('posts:profile', args=[self.author.username]),
+                reverse('posts:post_detail', args=[post.pk]))
+        etags = {url: client.get(url)['ETag'] for url in urls}
+        call_command('recount', stdout=StringIO())
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    @override_settings(POSTS_PAGINATION='cursor')
+    def test_pages_show_counters_without_aggregates(self):
+        """Профиль и пост выводят счетчики без агрегирующих запросов."""
+        post = Post.objects.create(text=TEST_TEXT, author=self.author)
+        Post.objects.create(text=TEST_TEXT, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        urls = (
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[post.pk]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.guest_client.get(url)
+                for query in queries.captured_queries:
+                    self.assertNotIn('COUNT(', query['sql'])
+                self.assertContains(response, 'Всего постов')
+        response = self.guest_client.get(urls[0])
+        self.assertContains(response, 'Всего постов: 2')
+        self.assertContains(response, 'Подписчиков: 1')
@@ -0,0 +1,90 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from ..dataset import GROUP_SLUG, USERNAME, Dataset
+from ..models import AuthorStats, Comment, Follow, Group, Post, User
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+OPTIONS = {'users': 30, 'groups': 4, 'posts': 60, 'comments': 80,
+           'follows': 5, 'seed': 7}
+
+
+def snapshot():
+    return (
+        list(Post.objects.order_by('pk').values_list(
+            'author__username', 'group__slug', 'text', 'pub_date')),
+        list(Comment.objects.order_by('pk').values_list(
+            'post__text', 'author__username', 'text', 'created')),
+        sorted(Follow.objects.values_list('user__username',
+                                          'author__username')),
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class DatasetTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_generates_requested_counts(self):
+        """Команда gendata создает заданное число записей."""
+        call_command('gendata', stdout=StringIO(), stderr=StringIO(),
+                     **OPTIONS)
+        self.assertEqual(User.objects.count(), OPTIONS['users'])
+        self.assertEqual(Group.objects.count(), OPTIONS['groups'])
+        self.assertEqual(Post.objects.count(), OPTIONS['posts'])
+        self.assertEqual(Comment.objects.count(), OPTIONS['comments'])
+        self.assertFalse(Follow.objects.filter(
+            user=F('author')).exists())
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list('posts_count', flat=True)),
+            OPTIONS['posts'])
+        self.assertTrue(User.objects.get(
+            username=USERNAME.format(0)).check_password('password'))
+
+    def test_deterministic_by_seed(self):
+        """Одинаковый seed дает одинаковые данные, другой -- другие."""
+        Dataset(**OPTIONS).generate()
+        first = snapshot()
+        for model in (Comment, Follow, Post, Group, User):
+            model.objects.all().delete()
+        Dataset(**OPTIONS).generate()
+        self.assertEqual(snapshot(), first)
+        for model in (Comment, Follow, Post, Group, User):
+            model.objects.all().delete()
+        Dataset(**{**OPTIONS, 'seed': 8}).generate()
+        self.assertNotEqual(snapshot(), first)
+
+    def test_popularity_is_skewed(self):
+        """Подписчики и посты групп распределены неравномерно."""
+        Dataset(**{**OPTIONS, 'users': 200, 'posts': 400,
+                   'follows': 10}).generate()
+        followers = sorted(
+            AuthorStats.objects.values_list('followers_count', flat=True),
+            reverse=True)
+        self.assertGreater(followers[0], 5 * followers[len(followers) // 2])
+        top = Post.objects.filter(group__slug=GROUP_SLUG.format(0)).count()
+        last = Post.objects.filter(group__slug=GROUP_SLUG.format(3)).count()
+        self.assertGreater(top, last)
+
+    def test_without_follows(self):
+        """При follows=0 данные создаются без подписок."""
+        Dataset(**{**OPTIONS, 'follows': 0}).generate()
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(Post.objects.count(), OPTIONS['posts'])
+
+    def test_images(self):
+        """Часть постов получает картинки из общего набора."""
+        Dataset(**{**OPTIONS, 'images': 0.5}).generate()
+        with_images = Post.objects.exclude(image='')
+        self.assertTrue(0 < with_images.count() < OPTIONS['posts'])
+        self.assertLessEqual(
+            with_images.values('image').distinct().count(), 16)
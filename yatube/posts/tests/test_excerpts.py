@@ -0,0 +1,76 @@
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import EXCERPT_LENGTH, Post, User
+
+
+TEST_USERNAME_AUTHOR = 'author'
+LONG_TEXT = 'слово ' * 100 + 'ХВОСТ'
+
+
+class ExcerptTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=TEST_USERNAME_AUTHOR)
+        cls.post = Post.objects.create(text=LONG_TEXT, author=cls.author)
+        cls.short = Post.objects.create(text='Короткий', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_excerpt_filled_on_save(self):
+        """Начало текста обрезается по слову и помечает длинный пост."""
+        self.assertEqual(self.post.text_length, len(LONG_TEXT))
+        self.assertLessEqual(len(self.post.excerpt), EXCERPT_LENGTH + 1)
+        self.assertTrue(self.post.excerpt.endswith('слово…'))
+        self.assertTrue(self.post.is_truncated)
+        self.assertEqual(self.short.excerpt, 'Короткий')
+        self.assertFalse(self.short.is_truncated)
+
+    def test_truncated_at_length_boundary(self):
+        """Текст на символ длиннее предела без пробелов помечается."""
+        for length, truncated in ((EXCERPT_LENGTH, False),
+                                  (EXCERPT_LENGTH + 1, True)):
+            with self.subTest(length=length):
+                post = Post(text='я' * length)
+                post.fill_excerpt()
+                self.assertEqual(post.is_truncated, truncated)
+
+    def test_feed_does_not_read_full_text(self):
+        """Лента не читает полный текст, страница поста -- читает."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'ХВОСТ')
+        self.assertContains(response, 'Читать дальше', 1)
+        for query in queries.captured_queries:
+            self.assertNotIn('"posts_post"."text"', query['sql'])
+        response = self.guest_client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        self.assertContains(response, 'ХВОСТ')
+
+    def test_backfill_command(self):
+        """Команда excerpts заполняет посты, сохраненные в обход save."""
+        Post.objects.update(excerpt='', text_length=0)
+        call_command('excerpts', stdout=StringIO())
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual((post.excerpt, post.text_length),
+                         (self.post.excerpt, self.post.text_length))
+
+    def test_backfill_migration(self):
+        """Миграция с новыми полями заполняет их у существующих постов."""
+        migration = import_module('posts.migrations.0021_post_excerpt')
+        Post.objects.update(excerpt='', text_length=0)
+        migration.fill_post_excerpts(apps, None)
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual((post.excerpt, post.text_length),
+                         (self.post.excerpt, self.post.text_length))
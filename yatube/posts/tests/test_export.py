@@ -0,0 +1,130 @@
+import json
+import shutil
+import tempfile
+import zipfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models.query import QuerySet
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import export
+from ..models import Comment, Group, Post, User
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEST_SLUG = 'test-slug'
+TEST_USERNAME_AUTHOR = 'author'
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=TEST_USERNAME_AUTHOR)
+        cls.reader = User.objects.create_user(username='reader')
+        cls.moderator = User.objects.create_user(username='moderator',
+                                                 is_staff=True)
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug=TEST_SLUG, description='Описание')
+        with mock.patch('posts.thumbnails.schedule'):
+            cls.posts = [
+                Post.objects.create(
+                    text=f'Пост {i}', author=cls.author, group=cls.group,
+                    image=SimpleUploadedFile(f'small{i}.gif', SMALL_GIF,
+                                             content_type='image/gif'))
+                for i in range(3)
+            ]
+        Post.objects.create(text='Чужой пост', author=cls.reader)
+        Comment.objects.create(post=cls.posts[0], author=cls.reader,
+                               text='Комментарий')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.url = reverse('posts:profile_export',
+                           args=[TEST_USERNAME_AUTHOR])
+
+    def test_ndjson_streams_posts_and_comments(self):
+        """NDJSON-выгрузка отдается потоком: посты, затем комментарии."""
+        response = self.author_client.get(self.url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in
+                b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['type'] for row in rows],
+                         ['post'] * 3 + ['comment'])
+        self.assertEqual([row['id'] for row in rows[:3]],
+                         [post.pk for post in self.posts])
+        self.assertEqual(rows[3]['post'], self.posts[0].pk)
+
+    def test_zip_contains_rows_and_images(self):
+        """Zip-архив содержит строки в формате bulkimport и картинки."""
+        response = self.author_client.get(self.url, {'format': 'zip'})
+        archive = zipfile.ZipFile(
+            BytesIO(b''.join(response.streaming_content)))
+        posts = archive.read('posts.jsonl').decode().splitlines()
+        self.assertEqual(len(posts), 3)
+        self.assertEqual(len(archive.read('comments.jsonl').splitlines()),
+                         1)
+        # Одинаковые картинки хранятся и выгружаются одним файлом.
+        image = json.loads(posts[0])['image']
+        self.assertEqual(archive.read(export.IMAGES_DIR + image), SMALL_GIF)
+        self.assertEqual(
+            len([name for name in archive.namelist()
+                 if name.startswith(export.IMAGES_DIR)]), 1)
+
+    def test_rows_read_in_chunks(self):
+        """Строки читаются итератором, а не одним списком."""
+        with mock.patch.object(export, 'EXPORT_CHUNK', 1), \
+                mock.patch.object(QuerySet, 'iterator', autospec=True,
+                                  side_effect=QuerySet.iterator) as iterator:
+            rows = list(export.post_rows(Post.objects.filter(
+                author=self.author)))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(iterator.call_args[1]['chunk_size'], 1)
+
+    def test_export_permissions(self):
+        """Профиль выгружает сам автор или модератор, группу -- модератор."""
+        reader = Client()
+        reader.force_login(self.reader)
+        moderator = Client()
+        moderator.force_login(self.moderator)
+        group_url = reverse('posts:group_export', args=[TEST_SLUG])
+        cases = (
+            (Client(), self.url, 302),
+            (reader, self.url, 403),
+            (moderator, self.url, 200),
+            (self.author_client, group_url, 403),
+            (moderator, group_url, 200),
+        )
+        for client, url, status in cases:
+            with self.subTest(url=url, status=status):
+                self.assertEqual(client.get(url).status_code, status)
+
+    def test_export_command(self):
+        """Команда export пишет ту же выгрузку в файл."""
+        with tempfile.NamedTemporaryFile(suffix='.ndjson') as output:
+            call_command('export', '--group', TEST_SLUG,
+                         output=output.name, stdout=StringIO())
+            rows = [json.loads(line) for line in output.read().splitlines()]
+        self.assertEqual(len(rows), 4)
+        self.assertEqual({row['type'] for row in rows}, {'post', 'comment'})
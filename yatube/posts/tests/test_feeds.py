@@ -0,0 +1,96 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..feeds import FEED_LENGTH
+from ..models import Group, Post, User
+
+
+TEST_SLUG = 'test-slug'
+OTHER_SLUG = 'other-slug'
+TEST_USERNAME_AUTHOR = 'author'
+
+
+class FeedsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=TEST_USERNAME_AUTHOR)
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug=TEST_SLUG, description='Описание')
+        cls.other_group = Group.objects.create(
+            title='Другая группа', slug=OTHER_SLUG, description='Описание')
+        cls.posts = [
+            Post.objects.create(text=f'Пост номер {i}', author=cls.author,
+                                group=cls.group)
+            for i in range(FEED_LENGTH + 2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.urls = {
+            reverse('posts:index_rss'): 'application/rss+xml',
+            reverse('posts:index_atom'): 'application/atom+xml',
+            reverse('posts:group_rss', args=[TEST_SLUG]):
+                'application/rss+xml',
+            reverse('posts:group_atom', args=[TEST_SLUG]):
+                'application/atom+xml',
+            reverse('posts:profile_rss', args=[TEST_USERNAME_AUTHOR]):
+                'application/rss+xml',
+            reverse('posts:profile_atom', args=[TEST_USERNAME_AUTHOR]):
+                'application/atom+xml',
+        }
+
+    def test_feeds_render_latest_posts(self):
+        """Ленты отдают последние FEED_LENGTH постов."""
+        for url, content_type in self.urls.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertTrue(
+                    response['Content-Type'].startswith(content_type))
+                content = response.content.decode()
+                self.assertIn('Пост номер 21', content)
+                self.assertNotIn('Пост номер 1<', content)
+                self.assertIn(reverse('posts:post_detail',
+                                      args=[self.posts[-1].pk]), content)
+
+    def test_feed_cached_as_bytes(self):
+        """Повторный опрос отдается из кеша: остается проверка группы."""
+        url = reverse('posts:group_rss', args=[TEST_SLUG])
+        first = self.guest_client.get(url)
+        with self.assertNumQueries(1):
+            second = self.guest_client.get(url)
+        self.assertEqual(first.content, second.content)
+
+    def test_conditional_get(self):
+        """Лента без изменений отвечает 304."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                response = self.guest_client.get(url,
+                                                 HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_new_post_invalidates_its_scope(self):
+        """Новый пост сбрасывает ленты своей группы, но не чужой."""
+        url = reverse('posts:group_rss', args=[TEST_SLUG])
+        other_url = reverse('posts:group_rss', args=[OTHER_SLUG])
+        etag = self.guest_client.get(url)['ETag']
+        other_etag = self.guest_client.get(other_url)['ETag']
+        Post.objects.create(text='Свежий пост', author=self.author,
+                            group=self.group)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Свежий пост', response.content.decode())
+        response = self.guest_client.get(other_url,
+                                         HTTP_IF_NONE_MATCH=other_etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_scope_not_found(self):
+        """Лента несуществующей группы или автора отвечает 404."""
+        for url in (reverse('posts:group_rss', args=['nothing']),
+                    reverse('posts:profile_atom', args=['nobody'])):
+            with self.subTest(url=url):
+                self.assertEqual(self.guest_client.get(url).status_code,
+                                 404)
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 from xml.etree.ElementTree import Comment
@@ -147,10 +148,11 @@ class PostFormTests(TestCase):
             reverse('posts:post_create'),
             data=self.form_data_image,
         )
+        digest = hashlib.sha256(SMALL_GIF).hexdigest()
         self.assertTrue(
             Post.objects.filter(
                 text='test_text',
-                image='posts/small.gif'
+                image=f'posts/{digest[:2]}/{digest}.gif'
             ).exists()
         )
         self.assertRedirects(
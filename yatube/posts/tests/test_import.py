@@ -0,0 +1,162 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils.dateparse import parse_datetime
+
+from ..models import (AuthorStats, Comment, Follow, Group, Post,
+                      TimelineEntry, User)
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEST_SLUG = 'test-slug'
+TEST_USERNAME_AUTHOR = 'author'
+TEST_USERNAME_USER = 'reader'
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BulkImportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=TEST_USERNAME_AUTHOR)
+        cls.reader = User.objects.create_user(username=TEST_USERNAME_USER)
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug=TEST_SLUG, description='Описание')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def write_jsonl(self, name, rows):
+        return self.write(name, ''.join(
+            (row if isinstance(row, str) else json.dumps(row)) + '\n'
+            for row in rows))
+
+    def run_import(self, *args, **options):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('bulkimport', *args, stdout=stdout, stderr=stderr,
+                     **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_import_posts(self):
+        """Посты загружаются с id, датой, группой и началом текста."""
+        path = self.write_jsonl('posts.jsonl', [
+            {'id': 100 + i, 'author': TEST_USERNAME_AUTHOR,
+             'text': f'Пост {i} ' + 'слово ' * 100, 'group': TEST_SLUG,
+             'pub_date': f'2020-01-0{i + 1}T12:00:00+00:00'}
+            for i in range(5)
+        ] + [
+            '{битая строка',
+            {'id': 200, 'author': 'nobody', 'text': 'Без автора'},
+            {'id': 100, 'author': TEST_USERNAME_AUTHOR, 'text': 'Повтор'},
+        ])
+        stdout, stderr = self.run_import('posts', path, batch_size=2)
+        self.assertIn('Загружено: 5, пропущено: 3', stdout)
+        self.assertIn('nobody', stderr)
+        post = Post.objects.get(pk=102)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.pub_date,
+                         parse_datetime('2020-01-03T12:00:00+00:00'))
+        self.assertTrue(post.is_truncated)
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).posts_count, 5)
+
+    def test_bad_post_id_skips_only_its_row(self):
+        """Нечисловой id пропускает свою строку, а не весь импорт."""
+        path = self.write_jsonl('posts.jsonl', [
+            {'id': 300, 'author': TEST_USERNAME_AUTHOR, 'text': 'Первый'},
+            {'id': 'abc', 'author': TEST_USERNAME_AUTHOR, 'text': 'Битый'},
+            {'id': 301, 'author': TEST_USERNAME_AUTHOR, 'text': 'Второй'},
+        ])
+        stdout, stderr = self.run_import('posts', path)
+        self.assertIn('Загружено: 2, пропущено: 1', stdout)
+        self.assertIn('abc', stderr)
+        self.assertEqual(
+            sorted(Post.objects.values_list('pk', flat=True)), [300, 301])
+
+    def test_import_comments_csv(self):
+        """Комментарии из CSV пересчитывают счетчик поста."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        path = self.write('comments.csv', (
+            'post,author,text,created\n'
+            f'{post.pk},{TEST_USERNAME_USER},Первый,2020-01-01T10:00:00\n'
+            f'{post.pk},{TEST_USERNAME_USER},"Второй, с запятой",\n'
+            f'{post.pk + 1},{TEST_USERNAME_USER},К чужому посту,\n'
+        ))
+        stdout, _ = self.run_import('comments', path)
+        self.assertIn('Загружено: 2, пропущено: 1', stdout)
+        self.assertEqual(Comment.objects.filter(post=post).count(), 2)
+        self.assertEqual(Post.objects.get(pk=post.pk).comments_count, 2)
+
+    def test_import_follows(self):
+        """Подписки раскладывают посты автора в ленту подписчика."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        path = self.write_jsonl('follows.jsonl', [
+            {'user': TEST_USERNAME_USER, 'author': TEST_USERNAME_AUTHOR},
+            {'user': TEST_USERNAME_USER, 'author': TEST_USERNAME_AUTHOR},
+            {'user': TEST_USERNAME_USER, 'author': TEST_USERNAME_USER},
+        ])
+        stdout, _ = self.run_import('follows', path)
+        self.assertIn('Загружено: 1, пропущено: 2', stdout)
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author).exists())
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).followers_count, 1)
+
+    def test_posts_fan_out_to_followers(self):
+        """Загруженные посты попадают в ленты подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        path = self.write_jsonl('posts.jsonl', [
+            {'id': 300, 'author': TEST_USERNAME_AUTHOR, 'text': 'Пост'},
+        ])
+        self.run_import('posts', path)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post_id=300).exists())
+
+    def test_create_missing_and_images(self):
+        """Неизвестные авторы и группы создаются, картинки копируются."""
+        with open(os.path.join(self.directory, 'small.gif'), 'wb') as file:
+            file.write(SMALL_GIF)
+        path = self.write_jsonl('posts.jsonl', [
+            {'id': 400, 'author': 'newcomer', 'text': 'Пост',
+             'group': 'new-group', 'image': 'small.gif'},
+            {'id': 401, 'author': 'newcomer', 'text': 'Пост',
+             'image': 'missing.gif'},
+        ])
+        stdout, stderr = self.run_import(
+            'posts', path, images=self.directory, create_missing=True)
+        self.assertIn('Загружено: 1, пропущено: 1', stdout)
+        self.assertIn('missing.gif', stderr)
+        post = Post.objects.get(pk=400)
+        self.assertEqual(post.author.username, 'newcomer')
+        self.assertFalse(post.author.has_usable_password())
+        self.assertEqual(post.group.slug, 'new-group')
+        self.assertTrue(post.image.name.startswith('posts/'))
+        self.assertEqual(post.image.read(), SMALL_GIF)
@@ -0,0 +1,141 @@
+import os
+import re
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+
+from core import metrics
+
+from ..models import Post, User
+from .utils import SidecarDBMixin
+
+TOKEN = 'scrape-secret'
+
+
+def sample(text, name, view='posts:index', **labels):
+    """Значение строки ``name{view, labels}`` из ответа /metrics."""
+    labels = metrics.format_labels({'view': view, **labels})
+    pattern = re.escape(name + '{' + labels + '}')
+    match = re.search(f'^{pattern} (\\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+class MetricsTests(SidecarDBMixin, TestCase):
+    def setUp(self):
+        path = self.use_sidecar_db(
+            'METRICS_DB', metrics.registry.stores, METRICS_ENABLED=True,
+            METRICS_TOKEN=TOKEN)
+        self.directory = os.path.dirname(path)
+        metrics.registry.pending.clear()
+        cache.clear()
+        author = User.objects.create_user('author')
+        Post.objects.create(text='Текст поста', author=author)
+        self.client = Client()
+
+    def scrape(self):
+        response = self.client.get('/metrics',
+                                   HTTP_AUTHORIZATION=f'Bearer {TOKEN}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        return response.content.decode()
+
+    def test_request_metrics(self):
+        """Запросы учитываются по имени адреса с задержкой и размером."""
+        first = self.client.get('/')
+        self.client.get('/')
+        text = self.scrape()
+        self.assertEqual(sample(
+            text, 'yatube_http_requests_total', method='GET', status=200), 2)
+        self.assertIn('# TYPE yatube_http_request_duration_seconds '
+                      'histogram', text)
+        self.assertEqual(sample(
+            text, 'yatube_http_request_duration_seconds_bucket',
+            le='+Inf'), 2)
+        self.assertEqual(sample(
+            text, 'yatube_http_response_size_bytes_count'), 2)
+        self.assertGreaterEqual(sample(
+            text, 'yatube_http_response_size_bytes_sum'),
+            len(first.content))
+        self.assertGreater(sample(text, 'yatube_db_queries_total'), 0)
+        self.assertGreater(sample(
+            text, 'yatube_template_render_seconds_total'), 0)
+
+    def test_buckets_are_cumulative(self):
+        """Корзины гистограммы идут по возрастанию le и не убывают."""
+        self.client.get('/')
+        text = self.scrape()
+        buckets = re.findall(
+            r'^yatube_http_request_duration_seconds_bucket\{view="posts:'
+            r'index",le="([^"]+)"\} (\S+)$', text, re.MULTILINE)
+        bounds = [float(le) for le, _ in buckets]
+        self.assertEqual(bounds, sorted(bounds))
+        counts = [float(value) for _, value in buckets]
+        self.assertEqual(counts, sorted(counts))
+
+    def test_cache_hits_and_misses(self):
+        """Холодная страница промахивается мимо кеша, повторная попадает."""
+        self.client.get('/')
+        text = self.scrape()
+        self.assertGreater(sample(
+            text, 'yatube_cache_requests_total', result='miss'), 0)
+        self.client.get('/')
+        text = self.scrape()
+        self.assertGreater(sample(
+            text, 'yatube_cache_requests_total', result='hit'), 0)
+
+    def test_processes_share_store(self):
+        """Значения других процессов складываются через общий файл."""
+        self.client.get('/')
+        other = metrics.Registry()
+        other.inc('yatube_http_requests_total', {
+            'view': 'posts:index', 'method': 'GET', 'status': 200}, 3)
+        other.flush(force=True)
+        text = self.scrape()
+        self.assertEqual(sample(
+            text, 'yatube_http_requests_total', method='GET', status=200),
+            4)
+
+    def test_unresolved_requests(self):
+        """Запросы без представления учитываются под общей меткой."""
+        self.client.get('/missing-page/')
+        text = self.scrape()
+        self.assertEqual(sample(
+            text, 'yatube_http_requests_total', view=metrics.UNRESOLVED,
+            method='GET', status=404), 1)
+
+    def test_endpoint_requires_token(self):
+        """Без верного токена /metrics не отдается, в том числе локально."""
+        for authorization in ('', 'Bearer чужой', TOKEN):
+            with self.subTest(authorization=authorization):
+                response = self.client.get(
+                    '/metrics', HTTP_AUTHORIZATION=authorization)
+                self.assertEqual(response.status_code, 404)
+        with override_settings(METRICS_TOKEN=None):
+            response = self.client.get('/metrics',
+                                       HTTP_AUTHORIZATION='Bearer None')
+            self.assertEqual(response.status_code, 404)
+
+    def test_store_errors_do_not_break_pages(self):
+        """Недоступное хранилище метрик не роняет страницу."""
+        # Каталог не открывается как файл SQLite.
+        with override_settings(METRICS_DB=self.directory,
+                               METRICS_FLUSH_SECONDS=0):
+            with self.assertLogs('core.metrics', 'ERROR'):
+                response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.addCleanup(metrics.registry.stores.pop, self.directory, None)
+        # Несохраненные значения дождались следующего сброса.
+        self.assertEqual(sample(
+            self.scrape(), 'yatube_http_requests_total', method='GET',
+            status=200), 1)
+
+    def test_disabled_by_default(self):
+        """Без METRICS_ENABLED запросы не замеряются."""
+        with override_settings(METRICS_ENABLED=False):
+            Client().get('/')
+        self.assertFalse(metrics.registry.pending)
+
+    def test_label_escaping(self):
+        """Кавычки, обратная косая черта и перевод строки экранируются."""
+        self.assertEqual(metrics.format_labels({'view': 'a"b\\c\nd'}),
+                         'view="a\\"b\\\\c\\nd"')
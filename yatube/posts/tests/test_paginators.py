@@ -0,0 +1,98 @@
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post, User
+from ..paginators import (CursorPage, CursorPaginator, decode_cursor,
+                          encode_cursor)
+
+
+TEST_USERNAME_AUTHOR = 'author'
+POSTS_AMOUNT = 25
+LIMIT_POST = 10
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=TEST_USERNAME_AUTHOR)
+        Post.objects.bulk_create(
+            Post(text=f'Test text {i}', author=cls.author)
+            for i in range(POSTS_AMOUNT)
+        )
+        cls.expected = list(
+            Post.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True)
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def get_page(self, params=''):
+        response = self.guest_client.get(reverse('posts:index') + params)
+        return response.context['page_obj']
+
+    def test_token_roundtrip(self):
+        """Токен курсора обратимо кодирует значения."""
+        values = ['2022-01-01T00:00:00+00:00', 5]
+        self.assertEqual(decode_cursor(encode_cursor(values)), values)
+        self.assertIsNone(decode_cursor('не-токен'))
+
+    @override_settings(POSTS_PAGINATION='cursor')
+    def test_walk_forward_and_back(self):
+        """Курсоры проходят ленту вперед и назад без пропусков."""
+        seen = []
+        params = ''
+        pages = []
+        while True:
+            page_obj = self.get_page(params)
+            self.assertIsInstance(page_obj, CursorPage)
+            pages.append([post.id for post in page_obj])
+            seen += pages[-1]
+            if not page_obj.next_cursor:
+                break
+            params = f'?after={page_obj.next_cursor}'
+        self.assertEqual(seen, self.expected)
+        self.assertEqual([len(ids) for ids in pages], [10, 10, 5])
+
+        page_obj = self.get_page(f'?before={page_obj.previous_cursor}')
+        self.assertEqual([post.id for post in page_obj], pages[1])
+        self.assertTrue(page_obj.has_previous())
+        self.assertTrue(page_obj.has_next())
+
+    def test_no_count_query(self):
+        """Курсорная страница выбирается одним запросом без COUNT."""
+        page_obj = CursorPaginator(Post.objects.all(), LIMIT_POST).get_page(
+            after=encode_cursor(['2000-01-01T00:00:00+00:00', 1]))
+        with self.assertNumQueries(1) as queries:
+            list(page_obj)
+            page_obj.has_next()
+        self.assertNotIn('COUNT', queries.captured_queries[0]['sql'])
+
+    def test_cursor_params_switch_mode(self):
+        """Токен в запросе включает курсорный режим и без настройки."""
+        page_obj = self.get_page()
+        self.assertNotIsInstance(page_obj, CursorPage)
+        last = page_obj[LIMIT_POST - 1]
+        token = encode_cursor([last.pub_date.isoformat(), last.id])
+        page_obj = self.get_page(f'?after={token}')
+        self.assertIsInstance(page_obj, CursorPage)
+        self.assertEqual(
+            [post.id for post in page_obj],
+            self.expected[LIMIT_POST:LIMIT_POST * 2]
+        )
+
+    def test_broken_cursor_gives_first_page(self):
+        """Битый токен отдает первую страницу."""
+        page_obj = self.get_page('?after=broken')
+        self.assertEqual(
+            [post.id for post in page_obj], self.expected[:LIMIT_POST]
+        )
+
+    def test_wrong_value_types_give_first_page(self):
+        """Токен с нестроковой датой отдает первую страницу, а не 500."""
+        for values in ([1, 1], [[1], 1], [None, 'x']):
+            with self.subTest(values=values):
+                page_obj = self.get_page(f'?after={encode_cursor(values)}')
+                self.assertEqual([post.id for post in page_obj],
+                                 self.expected[:LIMIT_POST])
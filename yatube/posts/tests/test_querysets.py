@@ -0,0 +1,66 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post, User
+
+
+TEST_TITLE = 'Тестовая группа'
+TEST_SLUG = 'test-slug'
+TEST_USERNAME_AUTHOR = 'author'
+
+
+class PostQuerySetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username=TEST_USERNAME_AUTHOR, first_name='Лев',
+            last_name='Толстой')
+        cls.group = Group.objects.create(title=TEST_TITLE, slug=TEST_SLUG)
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def create_posts(self, amount):
+        for i in range(amount):
+            Post.objects.create(text=f'Пост {i}', author=self.author,
+                                group=self.group)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(url)
+        return len(queries)
+
+    def test_feed_pages_have_no_n_plus_one(self):
+        """Число запросов страниц ленты не зависит от числа постов."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[TEST_SLUG]),
+            reverse('posts:profile', args=[TEST_USERNAME_AUTHOR]),
+        )
+        self.create_posts(1)
+        one = [self.count_queries(url) for url in urls]
+        self.create_posts(8)
+        many = [self.count_queries(url) for url in urls]
+        self.assertEqual(many, one)
+
+    def test_projections_skip_unused_fields(self):
+        """Проекции не читают поля, которые страницы не выводят."""
+        self.create_posts(1)
+        for name in ('for_feed', 'for_detail'):
+            with self.subTest(projection=name):
+                post = getattr(Post.objects, name)().get()
+                self.assertIn('audience', post.get_deferred_fields())
+                self.assertIn('password', post.author.get_deferred_fields())
+                with self.assertNumQueries(0):
+                    post.author.get_full_name()
+                    post.group.slug
+        post = Post.objects.for_detail().get()
+        with self.assertNumQueries(0):
+            post.author.stats.posts_count
+        post = Post.objects.for_admin().get()
+        self.assertEqual(post.get_deferred_fields(), {'image_variants'})
@@ -0,0 +1,138 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import DatabaseError, connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post, User
+from ..search import (FTS_TABLE, SCHEMA, install, match_expression,
+                      search)
+
+
+TEST_TITLE = 'Тестовая группа'
+TEST_SLUG = 'test-slug'
+TEST_USERNAME_AUTHOR = 'author'
+TEST_USERNAME_AUTHOR_2 = 'author2'
+LIMIT_POST = 10
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=TEST_USERNAME_AUTHOR)
+        cls.author2 = User.objects.create_user(
+            username=TEST_USERNAME_AUTHOR_2)
+        cls.group = Group.objects.create(title=TEST_TITLE, slug=TEST_SLUG)
+        cls.post = Post.objects.create(
+            text='Кошки спят', author=cls.author, group=cls.group)
+        cls.other = Post.objects.create(
+            text='Собаки лают', author=cls.author2)
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def found(self, **params):
+        response = self.guest_client.get(reverse('posts:search'), params)
+        return list(response.context['page_obj'])
+
+    def test_match_expression_quotes_operators(self):
+        """Операторы FTS5 из строки поиска не попадают в запрос."""
+        self.assertEqual(match_expression('кот OR "пес" кош*'),
+                         '"кот" "OR" "пес" "кош"*')
+        self.assertEqual(match_expression('-- !'), '')
+
+    def test_install_waits_for_posts_table(self):
+        """Без таблицы постов (migrate auth на новой базе) индекс не
+        создается."""
+        with mock.patch.object(connection.introspection, 'table_names',
+                               return_value=[]):
+            with CaptureQueriesContext(connection) as queries:
+                install()
+        self.assertFalse([query for query in queries.captured_queries
+                          if 'CREATE' in query['sql']])
+
+    def test_index_follows_changes(self):
+        """Индекс следует за созданием, правкой и удалением постов."""
+        self.assertEqual(self.found(q='кошки'), [self.post])
+        post = Post.objects.create(text='Кошки едят', author=self.author2)
+        self.assertEqual(len(self.found(q='кошки')), 2)
+        post.text = 'Птицы поют'
+        post.save()
+        self.assertEqual(self.found(q='птицы'), [post])
+        post.delete()
+        self.assertEqual(self.found(q='птицы'), [])
+
+    def test_prefix_and_filters(self):
+        """Поиск по префиксу и фильтры по группе и автору."""
+        self.assertEqual(self.found(q='кош'), [])
+        self.assertEqual(self.found(q='кош*'), [self.post])
+        Post.objects.create(text='Кошки лают', author=self.author2)
+        self.assertEqual(self.found(q='кошки', group=TEST_SLUG), [self.post])
+        self.assertEqual(
+            self.found(q='лают', author=TEST_USERNAME_AUTHOR_2,
+                       sort='new')[-1],
+            self.other)
+
+    def test_ranking(self):
+        """Более релевантный пост выше в выдаче."""
+        best = Post.objects.create(
+            text='Кошки, кошки и снова кошки', author=self.author)
+        self.assertEqual(self.found(q='кошки')[0], best)
+
+    def test_recent_by_pub_date(self):
+        """Сортировка по новизне идет по дате публикации, а не по id."""
+        imported = Post.objects.create(text='Кошки из архива',
+                                       author=self.author)
+        Post.objects.filter(pk=imported.pk).update(
+            pub_date=self.post.pub_date - timedelta(days=1))
+        self.assertEqual(self.found(q='кошки', sort='new'),
+                         [self.post, imported])
+
+    def test_cursor_pages(self):
+        """Курсоры проходят выдачу в обе стороны без пропусков."""
+        for sort in (False, True):
+            with self.subTest(recent=sort):
+                Post.objects.bulk_create(
+                    Post(text='Много котов ' + 'кот ' * (i % 4),
+                         author=self.author)
+                    for i in range(LIMIT_POST * 2 + 3)
+                )
+                results = search('котов', recent=sort)
+                expected = results[:None]
+                seen = []
+                page = None
+                while page is None or page.next_cursor:
+                    params = {'q': 'котов', 'sort': 'new' if sort else ''}
+                    if page is not None:
+                        params['after'] = page.next_cursor
+                    response = self.guest_client.get(
+                        reverse('posts:search'), params)
+                    page = response.context['page_obj']
+                    seen += list(page)
+                self.assertEqual(seen, expected)
+                response = self.guest_client.get(
+                    reverse('posts:search'),
+                    {'q': 'котов', 'before': page.previous_cursor,
+                     'sort': 'new' if sort else ''})
+                self.assertEqual(list(response.context['page_obj']),
+                                 expected[LIMIT_POST:LIMIT_POST * 2])
+                Post.objects.filter(text__startswith='Много').delete()
+
+
+class SearchInstallTests(TransactionTestCase):
+    """DDL индекса FTS5 проверяется вне транзакции TestCase: откат
+    виртуальной таблицы внутри нее ломает точки сохранения."""
+
+    def test_install_is_atomic(self):
+        """Сбой заполнения не оставляет пустой индекс."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE {FTS_TABLE}')
+        with mock.patch('posts.search.SCHEMA', SCHEMA[:1] + ('ошибка',)):
+            with self.assertRaises(DatabaseError):
+                install()
+        self.assertNotIn(FTS_TABLE, connection.introspection.table_names())
+        install()
+        self.assertIn(FTS_TABLE, connection.introspection.table_names())
@@ -0,0 +1,83 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+
+from core import slowlog
+
+from ..models import Post, User
+from .utils import SidecarDBMixin
+
+SECRET = 'секретныйзапрос'
+
+
+class SlowQueryLogTests(SidecarDBMixin, TestCase):
+    def setUp(self):
+        # Порог 0: в журнал попадает каждый запрос.
+        self.use_sidecar_db('SLOW_QUERY_DB', slowlog._logs, SLOW_QUERY_MS=0)
+        author = User.objects.create_user('author')
+        self.post = Post.objects.create(text='Текст поста', author=author)
+
+    def get(self, url):
+        with self.assertLogs('core.slowlog', 'WARNING'):
+            return Client().get(url)
+
+    def test_queries_logged_with_plan(self):
+        """Запрос записывается с адресом, длительностью и планом."""
+        self.get(f'/posts/{self.post.pk}/')
+        offenders = slowlog.slow_log().top(limit=100)
+        self.assertTrue(offenders)
+        views = {view for offender in offenders
+                 for view in offender.views}
+        self.assertIn('posts:post_detail', views)
+        plans = '\n'.join(offender.plan for offender in offenders)
+        self.assertRegex(plans, r'SEARCH|SCAN')
+        for offender in offenders:
+            self.assertGreaterEqual(offender.total_ms, offender.max_ms)
+
+    def test_strings_redacted(self):
+        """Строковые параметры не попадают в журнал."""
+        self.get('/search/?q=' + SECRET)
+        offenders = slowlog.slow_log().top(limit=100)
+        self.assertTrue(any(offender.views == ['posts:search']
+                            for offender in offenders))
+        for offender in offenders:
+            self.assertNotIn(SECRET, offender.params)
+
+    def test_threshold(self):
+        """Запросы быстрее порога не записываются."""
+        with override_settings(SLOW_QUERY_MS=60000):
+            Client().get('/')
+        self.assertEqual(slowlog.slow_log().top(), [])
+
+    def test_filters_apply_to_slowest_sample(self):
+        """Параметры и план берутся из выполнений, прошедших фильтры."""
+        log = slowlog.slow_log()
+        sql = 'SELECT 1 WHERE id = %s'
+        log.add('posts:index', sql, [1], 0.01, 'план ленты')
+        log.add('posts:profile', sql, [2], 0.5, 'план профиля')
+        offender, = log.top(view='posts:index')
+        self.assertEqual(offender.views, ['posts:index'])
+        self.assertEqual((offender.params, offender.plan),
+                         ('[1]', 'план ленты'))
+
+    def test_fingerprint_merges_in_lists(self):
+        """Списки IN разной длины дают один отпечаток."""
+        self.assertEqual(
+            slowlog.fingerprint('SELECT 1 WHERE id IN (%s, %s)'),
+            slowlog.fingerprint('SELECT  1\nWHERE id IN (%s, %s, %s)'))
+
+    def test_command_shows_top_offenders(self):
+        """Команда показывает самые затратные запросы с планами."""
+        self.get('/')
+        self.get('/')
+        out = StringIO()
+        call_command('slowqueries', top=3, plans=True, stdout=out)
+        output = out.getvalue()
+        self.assertIn('posts:index', output)
+        self.assertIn('SELECT', output)
+        out = StringIO()
+        call_command('slowqueries', view='missing:view', stdout=out)
+        self.assertIn('Медленных запросов нет', out.getvalue())
+        call_command('slowqueries', clear=True, stdout=StringIO())
+        self.assertEqual(slowlog.slow_log().top(), [])
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import thumbnails, variants
+from ..models import Post, User
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+TEST_USERNAME_AUTHOR = 'author'
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+OTHER_GIF = SMALL_GIF[:-2] + b'\x0B\x00\x3B'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class HashedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=TEST_USERNAME_AUTHOR)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def create_post(self, text, name, content=SMALL_GIF):
+        self.authorized_client.post(reverse('posts:post_create'), data={
+            'text': text,
+            'image': SimpleUploadedFile(
+                name=name, content=content, content_type='image/gif'),
+        })
+        return Post.objects.get(text=text)
+
+    def test_same_content_is_stored_once(self):
+        """Одинаковые загрузки ссылаются на один файл, разные -- нет."""
+        first = self.create_post('Первый', 'one.gif')
+        second = self.create_post('Второй', 'two.gif')
+        other = self.create_post('Третий', 'one.gif', OTHER_GIF)
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        self.assertTrue(first.image.name.startswith('posts/'))
+        self.assertTrue(first.image.name.endswith('.gif'))
+        folder = os.path.dirname(first.image.path)
+        self.assertEqual(os.listdir(folder),
+                         [os.path.basename(first.image.name)])
+        with open(first.image.path, 'rb') as file:
+            self.assertEqual(file.read(), SMALL_GIF)
+
+    def test_variants_built_once_per_content(self):
+        """Варианты повторной загрузки берутся у первого поста."""
+        first = self.create_post('Первый', 'one.gif')
+        thumbnails.generate(first.image.name)
+        second = self.create_post('Второй', 'two.gif')
+        with mock.patch.object(variants, 'build') as build:
+            thumbnails.generate(second.image.name)
+        build.assert_not_called()
+        second.refresh_from_db()
+        self.assertEqual(second.variants, Post.objects.get(
+            pk=first.pk).variants)
+        self.assertIsNotNone(thumbnails.lookup(second.image, 'card'))
@@ -0,0 +1,169 @@
+import shutil
+import tempfile
+import time
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.kvstores.base import add_prefix
+
+from core.cache import invalidate
+from .. import thumbnails
+from ..cache import INDEX
+from ..models import Post, User
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+TEST_TEXT = 'Тестовый пост'
+TEST_USERNAME_AUTHOR = 'author'
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def uploaded(name='small.gif'):
+    return SimpleUploadedFile(
+        name=name, content=SMALL_GIF, content_type='image/gif')
+
+
+def uploaded_png(name='photo.png', size=(300, 200), color=(200, 100, 50)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(
+        name=name, content=buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTemplateTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=TEST_USERNAME_AUTHOR)
+        cls.post = Post.objects.create(
+            text=TEST_TEXT, author=cls.author, image=uploaded())
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        thumbnails.clear_lookup_cache()
+        self.guest_client = Client()
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        )
+
+    def test_placeholder_without_thumbnail(self):
+        """Без готовой миниатюры страница выводит заглушку и не создает ее."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertContains(response, 'aspect-ratio')
+                self.assertNotContains(response, '<img class="card-img')
+        for size in thumbnails.GEOMETRIES:
+            self.assertIsNone(thumbnails.lookup(self.post.image, size))
+
+    def test_generated_thumbnail_replaces_placeholder(self):
+        """Созданная миниатюра сменяет заглушку и в кешированных страницах."""
+        for url in self.urls:
+            self.guest_client.get(url)
+        thumbnails.generate(self.post.image.name)
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertContains(response, '<img class="card-img')
+                self.assertNotContains(response, 'aspect-ratio')
+
+    def test_missing_thumbnail_cached_briefly(self):
+        """Отсутствие миниатюры кешируется только на MISS_TIMEOUT."""
+        geometry, options = thumbnails.GEOMETRIES['card']
+        key = add_prefix(thumbnails._thumbnail_file(
+            self.post.image, geometry, options).key)
+        self.assertIsNone(thumbnails.lookup(self.post.image, 'card'))
+        self.assertEqual(default.kvstore.cache.get(key), thumbnails.EMPTY)
+        later = time.time() + thumbnails.MISS_TIMEOUT + 1
+        with mock.patch('django.core.cache.backends.locmem.time') as clock:
+            clock.time.return_value = later
+            self.assertIsNone(default.kvstore.cache.get(key))
+
+    def test_page_thumbnails_are_batched(self):
+        """Миниатюры страницы ищутся одним запросом, затем без запросов."""
+        posts = [
+            Post.objects.create(text=TEST_TEXT, author=self.author,
+                                image=uploaded_png(color=(i, i, i)))
+            for i in range(3)
+        ]
+        for post in posts[1:]:
+            thumbnails.generate(post.image.name)
+        cache.clear()
+        url = reverse('posts:index')
+        for expected in (1, 0):
+            with self.subTest(kvstore_queries=expected):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.guest_client.get(url)
+                kvstore_queries = [
+                    query for query in queries.captured_queries
+                    if 'thumbnail_kvstore' in query['sql']
+                ]
+                self.assertEqual(len(kvstore_queries), expected)
+                self.assertContains(response, '<img class="card-img', 2)
+                invalidate(INDEX)
+
+    def test_variants_recorded_and_rendered(self):
+        """Варианты WebP записываются на пост и попадают в <picture>."""
+        post = Post.objects.create(
+            text=TEST_TEXT, author=self.author, image=uploaded_png())
+        thumbnails.generate(post.image.name)
+        post.refresh_from_db()
+        card = post.variants['card']['webp']
+        self.assertEqual([entry[:2] for entry in card],
+                         [[100, 100], [200, 200]])
+        cover = post.variants['cover']['webp']
+        self.assertEqual([entry[0] for entry in cover], [480])
+        for width, height, size, path in card:
+            with Image.open(f'{TEMP_MEDIA_ROOT}/{path}') as image:
+                self.assertEqual((image.format, image.size),
+                                 ('WEBP', (width, height)))
+        response = self.guest_client.get(
+            reverse('posts:post_detail', args=[post.pk]))
+        self.assertContains(response, '<picture>')
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, '480w')
+
+        post.image = uploaded_png(color=(0, 0, 0))
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.variants, {})
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_upload_schedules_all_sizes(self):
+        """Загрузка картинки через форму создает миниатюры всех размеров."""
+        client = Client()
+        client.force_login(self.author)
+        # TestCase не фиксирует транзакцию: колбэк коммита вызывается сразу.
+        with mock.patch.object(thumbnails.transaction, 'on_commit',
+                               lambda func: func()):
+            client.post(reverse('posts:post_create'),
+                        data={'text': 'Новый пост', 'image': uploaded()})
+        post = Post.objects.get(text='Новый пост')
+        for size in thumbnails.GEOMETRIES:
+            with self.subTest(size=size):
+                self.assertIsNotNone(thumbnails.lookup(post.image, size))
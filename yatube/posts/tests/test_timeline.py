@@ -0,0 +1,149 @@
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry, User
+from ..paginators import CursorPaginator
+from ..timeline import TimelineFeed
+
+
+TEST_USERNAME_AUTHOR = 'author'
+TEST_USERNAME_AUTHOR_2 = 'author2'
+TEST_USERNAME_USER = 'reader'
+LIMIT_POST = 10
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=TEST_USERNAME_AUTHOR)
+        cls.author2 = User.objects.create_user(
+            username=TEST_USERNAME_AUTHOR_2)
+        cls.user = User.objects.create_user(username=TEST_USERNAME_USER)
+        for i in range(3):
+            Post.objects.create(text=f'Старый пост {i}', author=cls.author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def follow_page(self, params=''):
+        response = self.authorized_client.get(
+            reverse('posts:follow_index') + params)
+        return response.context['page_obj']
+
+    def test_follow_backfills_timeline(self):
+        """Подписка добавляет в ленту уже опубликованные посты автора."""
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(len(self.follow_page()), 3)
+
+    def test_new_post_fans_out(self):
+        """Новый пост попадает в ленту подписчика и только в нее."""
+        Follow.objects.create(user=self.user, author=self.author2)
+        post = Post.objects.create(text='Новый пост', author=self.author2)
+        Post.objects.create(text='Чужой пост', author=self.author)
+        self.assertEqual(
+            [entry.post for entry in self.user.timeline.all()], [post])
+        self.assertEqual(list(self.follow_page()), [post])
+
+    def test_unfollow_trims_timeline(self):
+        """Отписка убирает посты автора из ленты."""
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=self.user, author=self.author2)
+        Post.objects.create(text='Новый пост', author=self.author2)
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username]))
+        page_obj = self.follow_page()
+        self.assertEqual(len(page_obj), 1)
+        self.assertEqual(page_obj[0].author, self.author2)
+
+    @override_settings(POSTS_PAGINATION='cursor')
+    def test_cursor_pages(self):
+        """Курсорная пагинация ленты проходит все посты по порядку."""
+        Follow.objects.create(user=self.user, author=self.author2)
+        for i in range(LIMIT_POST + 2):
+            Post.objects.create(text=f'Пост {i}', author=self.author2)
+        expected = list(Post.objects.filter(author=self.author2).order_by(
+            '-pub_date', '-id'))
+        first = self.follow_page()
+        second = self.follow_page(f'?after={first.next_cursor}')
+        self.assertEqual(list(first) + list(second), expected)
+        self.assertFalse(second.has_next())
+
+    def test_page_is_single_query(self):
+        """Страница ленты читается одним запросом."""
+        Follow.objects.create(user=self.user, author=self.author)
+        page_obj = CursorPaginator(
+            TimelineFeed(self.user), LIMIT_POST).get_page()
+        with self.assertNumQueries(1):
+            posts = list(page_obj)
+            [post.author.username for post in posts]
+        self.assertEqual(len(posts), 3)
+
+
+@override_settings(TIMELINE_PULL_THRESHOLD=1)
+class HybridTimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.star = User.objects.create_user(username=TEST_USERNAME_AUTHOR)
+        cls.author = User.objects.create_user(
+            username=TEST_USERNAME_AUTHOR_2)
+        cls.user = User.objects.create_user(username=TEST_USERNAME_USER)
+        cls.fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=cls.user, author=cls.star)
+        Follow.objects.create(user=cls.fan, author=cls.star)
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_delivery_is_recorded(self):
+        """Путь доставки и число подписчиков сохраняются на посте."""
+        star_post = Post.objects.create(text='Пост звезды', author=self.star)
+        post = Post.objects.create(text='Пост автора', author=self.author)
+        self.assertEqual(
+            (star_post.delivery, star_post.audience), (Post.PULL, 2))
+        self.assertEqual((post.delivery, post.audience), (Post.PUSH, 1))
+        self.assertFalse(star_post.timeline_entries.exists())
+
+    def test_pull_posts_are_merged(self):
+        """Посты крупного автора подмешиваются в ленту по дате."""
+        posts = [
+            Post.objects.create(text=f'Пост {i}',
+                                author=(self.star, self.author)[i % 2])
+            for i in range(LIMIT_POST + 3)
+        ]
+        posts.reverse()
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         posts[:LIMIT_POST])
+        response = self.authorized_client.get(
+            reverse('posts:follow_index') + '?page=2')
+        self.assertEqual(list(response.context['page_obj']),
+                         posts[LIMIT_POST:])
+
+    @override_settings(POSTS_PAGINATION='cursor')
+    def test_merged_cursor_pages(self):
+        """Курсорные страницы слитой ленты не теряют и не дублируют посты."""
+        posts = [
+            Post.objects.create(text=f'Пост {i}',
+                                author=(self.star, self.author)[i % 3 > 0])
+            for i in range(LIMIT_POST * 2 + 1)
+        ]
+        posts.reverse()
+        seen = []
+        params = ''
+        while True:
+            response = self.authorized_client.get(
+                reverse('posts:follow_index') + params)
+            page_obj = response.context['page_obj']
+            seen += list(page_obj)
+            if not page_obj.next_cursor:
+                break
+            params = f'?after={page_obj.next_cursor}'
+        self.assertEqual(seen, posts)
@@ -260,6 +260,48 @@ class PostCacheTest(TestCase):
         posts_amount_clear = len(response.context['page_obj'])
         self.assertEqual(posts_amount, posts_amount_clear)
 
+    def test_index_page_is_cached(self):
+        """Неизменная главная страница отдается из кеша."""
+        cache.clear()
+        response = self.guest_client.get(reverse('posts:index'))
+        # Карточка выводит excerpt, поэтому меняется и он: без кеша
+        # новый текст был бы виден.
+        Post.objects.filter(author=self.author).update(
+            text='Новый текст', excerpt='Новый текст')
+        cached_response = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(response.content, cached_response.content)
+        self.assertNotContains(cached_response, 'Новый текст')
+        cache.clear()
+        fresh_response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(fresh_response, 'Новый текст')
+
+    def test_index_cache_invalidated_by_new_post(self):
+        """Новый пост сразу появляется на главной странице."""
+        cache.clear()
+        self.guest_client.get(reverse('posts:index'))
+        Post.objects.create(text='Свежий пост', author=self.author)
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Свежий пост')
+
+    def test_index_cache_invalidated_by_author_rename(self):
+        """Смена имени автора сбрасывает кеш главной страницы."""
+        cache.clear()
+        self.guest_client.get(reverse('posts:index'))
+        self.author.first_name = 'Лев'
+        self.author.last_name = 'Толстой'
+        self.author.save()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Лев Толстой')
+
+    def test_index_pages_are_cached_separately(self):
+        """Каждая страница главной кешируется под своим ключом."""
+        cache.clear()
+        first = self.guest_client.get(reverse('posts:index'))
+        second = self.guest_client.get(reverse('posts:index') + '?page=2')
+        self.assertNotEqual(first.content, second.content)
+        self.assertContains(first, 'Test text 13')
+        self.assertNotContains(second, 'Test text 13')
+
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostFollowingTest(TestCase):
@@ -0,0 +1,29 @@
+import os
+import tempfile
+
+from django.test import override_settings
+
+
+class SidecarDBMixin:
+    """Временный файл SQLite для хранилищ на основе core.sidecar."""
+
+    def use_sidecar_db(self, setting, instances, **overrides):
+        """Направляет ``setting`` на новый файл во временном каталоге.
+
+        После теста удаляются файл с журналами -wal и -shm, каталог и
+        открытое хранилище из словаря ``instances``, где модуль хранит
+        экземпляры по пути. Остальные ``overrides`` действуют тоже до
+        конца теста. Возвращает путь к файлу.
+        """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, directory)
+        path = os.path.join(directory, 'sidecar.sqlite3')
+        for suffix in ('', '-wal', '-shm'):
+            self.addCleanup(
+                lambda name: os.path.exists(name) and os.remove(name),
+                path + suffix)
+        self.addCleanup(instances.pop, path, None)
+        settings = override_settings(**{setting: path}, **overrides)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        return path
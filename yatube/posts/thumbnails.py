@@ -0,0 +1,217 @@
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.conf import settings
+from django.db import connections, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.cache import invalidate
+
+from . import cache, variants
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+EMPTY = cached_db_kvstore.EMPTY_VALUE
+
+# Все размеры, в которых шаблоны выводят Post.image.
+GEOMETRIES = {
+    'card': ('100x100', {'crop': 'center', 'upscale': True}),
+    'cover': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+
+# Сколько найденных миниатюр помнит процесс. Ключ миниатюры выводится
+# из имени исходника и параметров, поэтому найденная запись не устаревает.
+LRU_SIZE = 4096
+
+# Сколько секунд кеш sorl помнит отсутствие миниатюры. sorl хранит его
+# THUMBNAIL_CACHE_TIMEOUT (годы), и миниатюра, созданная воркером с
+# другим кешем, не показывалась бы; короткий срок ограничивает и это
+# ожидание, и число запросов к таблице хранилища.
+MISS_TIMEOUT = 60
+
+# Переменная контекста карточки с заранее найденными миниатюрами
+# страницы (заполняет posts.cards, читает тег post_thumbnail).
+PREFETCHED = 'prefetched_thumbnails'
+
+_executor = None
+_pending = set()
+_lock = Lock()
+_found = OrderedDict()
+
+
+def schedule(name):
+    """Ставит генерацию миниатюр картинки в очередь после коммита."""
+    if name:
+        transaction.on_commit(lambda: submit(name))
+
+
+def submit(name):
+    """Отдает картинку пулу воркеров; повторы в очереди отбрасываются.
+
+    При THUMBNAIL_WORKERS = 0 миниатюры генерируются сразу.
+    """
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    if settings.THUMBNAIL_WORKERS:
+        _get_executor().submit(_run, name)
+    else:
+        _run(name)
+
+
+def generate(name):
+    """Создает миниатюры и варианты картинки и сбрасывает кеш ее постов.
+
+    Одинаковые загрузки хранятся в одном файле (см. HashedFileSystemStorage),
+    поэтому варианты, уже построенные для другого поста, переиспользуются.
+    """
+    source = _source(name)
+    for geometry, options in GEOMETRIES.values():
+        get_thumbnail(source, geometry, **options)
+    posts = Post.objects.filter(image=name)
+    image_variants = posts.exclude(image_variants='').values_list(
+        'image_variants', flat=True).first()
+    if image_variants is None:
+        image_variants = variants.dumps(variants.build(source, GEOMETRIES))
+    posts.filter(image_variants='').update(image_variants=image_variants)
+    posts = Post.objects.filter(image=name).values_list(
+        'pk', 'author_id', 'group__slug')
+    for post_id, author_id, slug in posts:
+        invalidate(
+            cache.INDEX,
+            cache.post_tag(post_id),
+            cache.author_tag(author_id),
+            *([cache.group_tag(slug)] if slug else []),
+        )
+
+
+def lookup(image, size):
+    """Готовая миниатюра из хранилища sorl или None.
+
+    В отличие от тега ``thumbnail`` никогда не декодирует картинку:
+    ключ миниатюры вычисляется так же, как в ``ThumbnailBackend``.
+    """
+    return lookup_many([(image, size)]).get((image, size))
+
+
+def lookup_many(pairs):
+    """Миниатюры для пар (картинка, размер) за один проход по хранилищу.
+
+    Порядок поиска: LRU процесса, один ``get_many`` к кешу sorl, один
+    запрос к таблице хранилища для промахов кеша. Возвращает словарь
+    {(картинка, размер): миниатюра или None}.
+    """
+    keys = {}
+    for image, size in pairs:
+        if image:
+            geometry, options = GEOMETRIES[size]
+            thumbnail = _thumbnail_file(image, geometry, options)
+            keys[(image, size)] = add_prefix(thumbnail.key)
+    values = _get_raw_many(set(keys.values()))
+    return {
+        pair: deserialize_image_file(values[key]) if key in values else None
+        for pair, key in keys.items()
+    }
+
+
+def clear_lookup_cache():
+    """Очищает LRU найденных миниатюр процесса."""
+    with _lock:
+        _found.clear()
+
+
+def _get_raw_many(keys):
+    values = {}
+    with _lock:
+        for key in keys:
+            if key in _found:
+                _found.move_to_end(key)
+                values[key] = _found[key]
+    missing = keys - set(values)
+    if not missing:
+        return values
+    kvstore = default.kvstore
+    if not isinstance(kvstore, cached_db_kvstore.KVStore):
+        found = {key: kvstore._get_raw(key) for key in missing}
+    else:
+        found = kvstore.cache.get_many(missing)
+        stored = dict(KVStoreModel.objects.filter(
+            key__in=missing - set(found)).values_list('key', 'value'))
+        misses = {key: stored.get(key, EMPTY)
+                  for key in missing - set(found)}
+        hits = {key: value for key, value in misses.items()
+                if value != EMPTY}
+        if hits:
+            kvstore.cache.set_many(
+                hits, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        if len(hits) < len(misses):
+            kvstore.cache.set_many(
+                {key: EMPTY for key in misses.keys() - hits.keys()},
+                MISS_TIMEOUT)
+        found.update(misses)
+    found = {key: value for key, value in found.items()
+             if value and value != EMPTY}
+    with _lock:
+        for key, value in found.items():
+            _found[key] = value
+        while len(_found) > LRU_SIZE:
+            _found.popitem(last=False)
+    values.update(found)
+    return values
+
+
+def _source(image):
+    # Имя без хранилища относится к хранилищу поля Post.image: от
+    # класса хранилища зависит ключ миниатюры в sorl.
+    if hasattr(image, 'storage'):
+        return ImageFile(image)
+    return ImageFile(image, Post._meta.get_field('image').storage)
+
+
+def _thumbnail_file(image, geometry, options):
+    backend = default.backend
+    source = _source(image)
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return ImageFile(name, default.storage)
+
+
+def _run(name):
+    try:
+        generate(name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры %s', name)
+    finally:
+        with _lock:
+            _pending.discard(name)
+        if settings.THUMBNAIL_WORKERS:
+            connections.close_all()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
@@ -0,0 +1,225 @@
+import heapq
+from collections import defaultdict
+from itertools import islice
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+
+from . import counters
+from .models import Follow, Post, TimelineEntry
+from .paginators import FEED_ORDERING, seek
+
+TIMELINE_ORDERING = ('-pub_date', '-post')
+BATCH_SIZE = 500
+# Постов в одном INSERT ... SELECT: ограничено числом параметров SQLite.
+FAN_OUT_CHUNK = 500
+
+
+def choose_delivery(post):
+    """Выбирает путь доставки нового поста и запоминает его на посте.
+
+    Сохраненные ``delivery`` и ``audience`` позволяют подобрать
+    TIMELINE_PULL_THRESHOLD по реальному распределению подписчиков.
+    """
+    _set_delivery(post, counters.followers_count(post.author_id))
+
+
+def choose_delivery_many(posts):
+    """``choose_delivery`` для пачки постов одним запросом к подпискам.
+
+    Подписчики считаются по Follow, а не по счетчикам: при пакетной
+    загрузке счетчики пересчитываются только в конце.
+    """
+    audiences = dict(Follow.objects.filter(
+        author_id__in={post.author_id for post in posts}
+    ).order_by().values('author_id').annotate(
+        n=Count('pk')).values_list('author_id', 'n'))
+    for post in posts:
+        _set_delivery(post, audiences.get(post.author_id, 0))
+
+
+def _set_delivery(post, audience):
+    post.audience = audience
+    if post.audience > settings.TIMELINE_PULL_THRESHOLD:
+        post.delivery = Post.PULL
+    else:
+        post.delivery = Post.PUSH
+
+
+def fan_out(post):
+    """Раскладывает новый пост в ленты всех подписчиков автора."""
+    fan_out_many([post])
+
+
+def fan_out_many(posts):
+    """Раскладывает пачку постов одним INSERT ... SELECT по подпискам.
+
+    Строк ленты у поста столько же, сколько подписчиков у автора, поэтому
+    они не создаются как объекты моделей.
+    """
+    post_ids = [post.pk for post in posts if post.delivery == Post.PUSH]
+    for start in range(0, len(post_ids), FAN_OUT_CHUNK):
+        _insert_entries(post_ids[start:start + FAN_OUT_CHUNK])
+
+
+def _insert_entries(post_ids):
+    entry, follow, post = (
+        model._meta for model in (TimelineEntry, Follow, Post))
+    columns = ', '.join(
+        entry.get_field(name).column
+        for name in ('user', 'post', 'author', 'pub_date'))
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    sql = (
+        f'{connection.ops.insert_statement(ignore_conflicts=True)} '
+        f'{entry.db_table} ({columns}) '
+        f'SELECT f.{follow.get_field("user").column}, p.{post.pk.column}, '
+        f'p.{post.get_field("author").column}, '
+        f'p.{post.get_field("pub_date").column} '
+        f'FROM {post.db_table} p JOIN {follow.db_table} f '
+        f'ON f.{follow.get_field("author").column} = '
+        f'p.{post.get_field("author").column} '
+        f'WHERE p.{post.pk.column} IN ({placeholders}) '
+        f'{connection.ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, post_ids)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние посты автора после подписки."""
+    backfill_many([(user_id, author_id)])
+
+
+def backfill_many(pairs):
+    """``backfill`` для пар (подписчик, автор): один запрос на автора."""
+    followers = defaultdict(list)
+    for user_id, author_id in pairs:
+        followers[author_id].append(user_id)
+    for author_id, user_ids in followers.items():
+        posts = list(Post.objects.filter(
+            author_id=author_id, delivery=Post.PUSH
+        ).order_by('-pub_date').values_list(
+            'id', 'pub_date')[:settings.TIMELINE_BACKFILL])
+        _bulk_insert(
+            TimelineEntry(user_id=user_id,
+                          post_id=post_id,
+                          author_id=author_id,
+                          pub_date=pub_date)
+            for user_id in user_ids
+            for post_id, pub_date in posts
+        )
+
+
+def trim(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, author_id=author_id
+    ).delete()
+
+
+def follow_feed(user):
+    """Лента подписок: разложенные посты плюс посты крупных авторов.
+
+    Посты авторов, доставляемые при чтении, берутся отдельным потоком на
+    каждого автора и сливаются с материализованной лентой.
+    """
+    pull_authors = Post.objects.filter(
+        delivery=Post.PULL,
+        author__in=Follow.objects.filter(user=user).values('author'),
+    ).order_by().values_list('author', flat=True).distinct()
+    streams = [
+        Post.objects.for_feed().filter(
+            author_id=author_id, delivery=Post.PULL)
+        for author_id in pull_authors
+    ]
+    if not streams:
+        return TimelineFeed(user)
+    return MergedFeed([TimelineFeed(user)] + streams)
+
+
+def _bulk_insert(entries):
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, BATCH_SIZE))
+        if not batch:
+            return
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class TimelineFeed:
+    """Лента подписок пользователя, читаемая из TimelineEntry.
+
+    Поддерживает и ``Paginator`` (count и срезы), и ``CursorPaginator``
+    (seek). Посты страницы выбираются одним запросом: диапазон по индексу
+    ленты во вложенном подзапросе и выборка постов по первичному ключу.
+    """
+
+    model = Post
+
+    def __init__(self, user, entries=None, reverse=False):
+        self.user = user
+        self.reverse = reverse
+        if entries is None:
+            entries = seek(TimelineEntry.objects.filter(user=user),
+                           TIMELINE_ORDERING)
+        self.entries = entries
+
+    def count(self):
+        return self.entries.count()
+
+    def seek(self, values, reverse=False):
+        entries = seek(TimelineEntry.objects.filter(user=self.user),
+                       TIMELINE_ORDERING, values, reverse)
+        return TimelineFeed(self.user, entries, reverse)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        ordering = ('pub_date', 'id') if self.reverse else (
+            '-pub_date', '-id')
+        return list(
+            Post.objects.for_feed().filter(
+                id__in=self.entries.values('post_id')[index]
+            ).order_by(*ordering)
+        )
+
+
+class MergedFeed:
+    """K-путевое слияние потоков постов, упорядоченных по (pub_date, id).
+
+    Поток -- queryset постов или объект с тем же протоколом, что и
+    ``TimelineFeed``. Для среза [a:b] из каждого потока читается не
+    больше b строк.
+    """
+
+    model = Post
+
+    def __init__(self, streams, reverse=False):
+        self.reverse = reverse
+        self.streams = [
+            stream if hasattr(stream, 'seek')
+            else seek(stream, FEED_ORDERING, reverse=reverse)
+            for stream in streams
+        ]
+
+    def count(self):
+        return sum(stream.count() for stream in self.streams)
+
+    def seek(self, values, reverse=False):
+        return MergedFeed([
+            stream.seek(values, reverse) if hasattr(stream, 'seek')
+            else seek(stream, FEED_ORDERING, values, reverse)
+            for stream in self.streams
+        ], reverse)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        merged = heapq.merge(
+            *(stream[:index.stop] for stream in self.streams),
+            key=attrgetter('pub_date', 'id'),
+            reverse=not self.reverse,
+        )
+        return list(islice(merged, index.start, index.stop))
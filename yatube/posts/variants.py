@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+try:
+    # AVIF кодирует плагин pillow-avif-plugin, если он установлен.
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+# Ширины вариантов для каждого размера из thumbnails.GEOMETRIES и
+# атрибут sizes для <source>.
+WIDTHS = {
+    'card': ((100, 200), '100px'),
+    'cover': ((480, 960), '(max-width: 960px) 100vw, 960px'),
+}
+# Форматы в порядке предпочтения браузером: (расширение, формат PIL,
+# MIME-тип, параметры сохранения).
+FORMATS = (
+    ('avif', 'AVIF', 'image/avif', {'quality': 60}),
+    ('webp', 'WEBP', 'image/webp', {'quality': 80, 'method': 6}),
+)
+VARIANTS_DIR = 'posts/variants'
+
+
+def available_formats():
+    return [fmt for fmt in FORMATS if fmt[1] in Image.SAVE]
+
+
+def build(source, geometries):
+    """Создает варианты картинки ``source`` всех размеров и форматов.
+
+    Возвращает описание для ``Post.image_variants``:
+    {размер: {расширение: [[ширина, высота, байт, файл], ...]}}.
+    Ширины больше исходной пропускаются, кроме наименьшей.
+    """
+    with source.storage.open(source.name) as file:
+        image = Image.open(file)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info
+                              or image.mode in ('LA', 'PA') else 'RGB')
+    folder = os.path.join(
+        VARIANTS_DIR, hashlib.sha1(source.name.encode()).hexdigest()[:12])
+    variants = {}
+    for size, (geometry, options) in geometries.items():
+        width, height = map(int, geometry.split('x'))
+        widths, _ = WIDTHS[size]
+        widths = [widths[0]] + [w for w in widths[1:] if w <= image.width]
+        for ext, fmt, _, params in available_formats():
+            entries = variants.setdefault(size, {}).setdefault(ext, [])
+            for target in widths:
+                target_height = round(target * height / width)
+                resized = ImageOps.fit(image, (target, target_height),
+                                       Image.LANCZOS)
+                buffer = BytesIO()
+                resized.save(buffer, fmt, **params)
+                path = os.path.join(folder, f'{size}-{target}.{ext}')
+                if default_storage.exists(path):
+                    default_storage.delete(path)
+                path = default_storage.save(path,
+                                            ContentFile(buffer.getvalue()))
+                entries.append([target, target_height, buffer.tell(), path])
+    return variants
+
+
+def dumps(variants):
+    return json.dumps(variants, separators=(',', ':'))
+
+
+def sources(post, size):
+    """Элементы <source> для картинки поста: [{type, srcset, sizes}]."""
+    variants = post.variants.get(size, {})
+    _, sizes = WIDTHS[size]
+    result = []
+    for ext, _, mime, _ in FORMATS:
+        if variants.get(ext):
+            srcset = ', '.join(
+                f'{default_storage.url(path)} {width}w'
+                for width, _, _, path in variants[ext]
+            )
+            result.append({'type': mime, 'srcset': srcset, 'sizes': sizes})
+    return result
@@ -1,63 +1,218 @@
+import hashlib
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
 from django.core.paginator import Paginator
+from django.utils.http import urlencode
+from django.views.decorators.http import condition
 from django.shortcuts import (render, get_object_or_404, redirect)
 from django.contrib.auth.decorators import login_required
 
-from .models import Follow, Post, Group, User
+from core.budgets import query_budget
+from core.cache import tags_version
+
+from . import cache, export
+from .models import Comment, Follow, Post, Group, User
 from .forms import PostForm, CommentForm
+from .paginators import CursorPaginator
+from .search import search as search_posts
+from .timeline import follow_feed
 
 LIMIT_POST = 10
+CURSOR_PARAMS = ('after', 'before')
+SEARCH_PARAMS = ('q', 'group', 'author', 'sort')
+COMMENTS_LIMIT = 20
+COMMENT_ORDERING = ('created', 'id')
 
 
 def paginator(request, queryset):
+    if (settings.POSTS_PAGINATION == 'cursor'
+            or any(param in request.GET for param in CURSOR_PARAMS)):
+        return CursorPaginator(queryset, LIMIT_POST).get_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
     pagin_obj = Paginator(queryset, LIMIT_POST)
     page_number = request.GET.get('page')
     page_obj = pagin_obj.get_page(page_number)
     return page_obj
 
 
+def page_etag(request, version):
+    """ETag страницы: версия ее тегов плюс то, что зависит от посетителя.
+
+    Шапка зависит от пользователя, а форма комментария — от CSRF-куки.
+    """
+    viewer = '{}:{}'.format(request.user.pk,
+                            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''))
+    return hashlib.md5(f'{version}|{viewer}'.encode()).hexdigest()
+
+
+def etag_by_tags(get_tags):
+    """Условный GET по версии тегов страницы.
+
+    ``get_tags`` получает аргументы представления и возвращает теги
+    страницы или None, если страницы нет. Версии тегов меняются при
+    любой правке, которая видна на странице, поэтому совпавший
+    ``If-None-Match`` получает 304 без основного запроса и рендеринга.
+
+    Версии хранятся в кеше Django: при нескольких воркерах нужен общий
+    бэкенд (см. CACHES), иначе сброс в одном процессе не виден другим.
+    """
+    def etag(request, *args, **kwargs):
+        tags = get_tags(*args, **kwargs)
+        if tags is None:
+            return None
+        return page_etag(request, tags_version(*tags))
+    return condition(etag_func=etag)
+
+
+def group_page_tags(slug):
+    # Для несуществующей группы версия не заводится: ключ тега живет
+    # без срока.
+    if not Group.objects.filter(slug=slug).exists():
+        return None
+    return cache.group_page_tags(slug)
+
+
+def profile_page_tags(username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    return None if author_id is None else cache.profile_tags(author_id)
+
+
+def post_page_tags(post_id):
+    author_id = Post.objects.filter(pk=post_id).values_list(
+        'author_id', flat=True).first()
+    return (None if author_id is None
+            else cache.detail_tags(post_id, author_id))
+
+
+def comments_page(post_id, after=None):
+    comments = Comment.objects.filter(
+        post_id=post_id).select_related('author')
+    return CursorPaginator(
+        comments, COMMENTS_LIMIT, COMMENT_ORDERING).get_page(after=after)
+
+
+@query_budget(4)
+@etag_by_tags(cache.index_tags)
 def index(request):
-    post_list = Post.objects.select_related('group', 'author')
+    post_list = Post.objects.for_feed()
     page_obj = paginator(request, post_list)
     context = {
         'page_obj': page_obj,
+        'cache_version': tags_version(*cache.index_tags()),
     }
     return render(request, 'posts/index.html', context)
 
 
+@query_budget(6)
+@etag_by_tags(group_page_tags)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.for_feed()
     page_obj = paginator(request, posts)
     context = {
         'group': group,
         'page_obj': page_obj,
+        'cache_version': tags_version(*cache.group_page_tags(slug)),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@query_budget(6)
+@etag_by_tags(profile_page_tags)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post = author.posts.all()
-    page_obj = paginator(request, post)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    posts = author.posts.for_feed()
+    page_obj = paginator(request, posts)
     context = {
         'author': author,
         'page_obj': page_obj,
+        'cache_version': tags_version(*cache.profile_tags(author.pk)),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@query_budget(5)
+@etag_by_tags(post_page_tags)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.for_detail(), id=post_id)
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    comments = comments_page(post.pk)
     context = {
         'post': post,
         'form': form,
-        'comments': comments
+        'comments': comments,
+        'cache_version': tags_version(
+            *cache.detail_tags(post.pk, post.author_id)),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@query_budget(2)
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    context = {
+        'post': post,
+        'comments': comments_page(post.pk, request.GET.get('after')),
+        'cache_version': tags_version(*cache.comment_list_tags(post.pk)),
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
+@query_budget(4)
+def search(request):
+    query = request.GET.get('q', '').strip()
+    filters = {}
+    if request.GET.get('group'):
+        filters['group_id'] = get_object_or_404(
+            Group, slug=request.GET['group']).pk
+    if request.GET.get('author'):
+        filters['author_id'] = get_object_or_404(
+            User, username=request.GET['author']).pk
+    results = search_posts(query, recent=request.GET.get('sort') == 'new',
+                           **filters)
+    page_obj = CursorPaginator(
+        results, LIMIT_POST, results.ordering
+    ).get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    params = {key: request.GET[key] for key in SEARCH_PARAMS
+              if request.GET.get(key)}
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'query_prefix': urlencode(params) + '&' if params else '',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@query_budget(5)
+@login_required
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    if request.user != author and not request.user.is_staff:
+        raise PermissionDenied
+    return export.response(export.author_scope(author), author.username,
+                           request.GET.get('format'))
+
+
+@query_budget(5)
+@login_required
+def group_export(request, slug):
+    if not request.user.is_staff:
+        raise PermissionDenied
+    group = get_object_or_404(Group, slug=slug)
+    return export.response(export.group_scope(group), group.slug,
+                           request.GET.get('format'))
+
+
+@query_budget(3)
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None,
@@ -75,6 +230,7 @@ def post_create(request):
     return redirect('posts:profile', request.user.username)
 
 
+@query_budget(5)
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
@@ -94,6 +250,7 @@ def post_edit(request, post_id):
     return redirect('posts:post_detail', post_id)
 
 
+@query_budget(5)
 @login_required
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
@@ -106,11 +263,14 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+# Плюс по запросу на каждого автора, посты которого собираются при
+# чтении (Post.PULL).
+@query_budget(5)
 @login_required
 def follow_index(request):
     # информация о текущем пользователе доступна в переменной request.user
     # ...
-    post_list = Post.objects.filter(author__following__user=request.user)
+    post_list = follow_feed(request.user)
     page_obj = paginator(request, post_list)
     context = {
         'page_obj': page_obj,
@@ -118,19 +278,21 @@ def follow_index(request):
     return render(request, 'posts/follow.html', context)
 
 
+# Сигналы подписки обновляют счетчики и ленту подписчика.
+@query_budget(11)
 @login_required
 def profile_follow(request, username):
     # Подписаться на автора
     follow_author = get_object_or_404(User, username=username)
-    follow_user = get_object_or_404(User, username=request.user)
-    if follow_user != follow_author:
+    if request.user != follow_author:
         Follow.objects.get_or_create(
             author=follow_author,
-            user=follow_user,
+            user=request.user,
         )
     return redirect('posts:follow_index')
 
 
+@query_budget(8)
 @login_required
 def profile_unfollow(request, username):
     # Дизлайк, отписка
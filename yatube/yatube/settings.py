@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -32,6 +33,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.SlowQueryMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -45,7 +49,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.metrics.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -115,8 +119,45 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Режим пагинации лент: 'pages' (номера страниц) или 'cursor'
+# (курсор по (pub_date, id), без COUNT и OFFSET).
+POSTS_PAGINATION = 'pages'
+
+# Сколько последних постов автора попадает в ленту при подписке.
+TIMELINE_BACKFILL = 200
+
+# Посты авторов, у которых подписчиков больше порога, не раскладываются
+# по лентам при публикации, а подмешиваются при чтении.
+TIMELINE_PULL_THRESHOLD = 5000
+
+# Воркеры, заранее создающие миниатюры загруженных картинок.
+# 0 -- создавать сразу после коммита в потоке запроса: при разработке
+# и в тестах миниатюры готовы к следующему запросу.
+THUMBNAIL_WORKERS = 0 if DEBUG else 2
+
+# Кеш страниц сбрасывается сигналами моделей. Чтобы сброс был виден
+# всем воркерам, в боевом окружении нужен общий бэкенд (memcached, redis):
+# по версиям тегов из кеша строятся и ETag страниц, и с кешем процесса
+# разные воркеры отдавали бы разные ETag и устаревшие 304.
+# Бэкенд из core.metrics считает попадания в кеш для /metrics.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.metrics.LocMemCache',
     }
 }
+
+# Метрики запросов для Prometheus (/metrics). Процессы копят значения
+# в памяти и раз в METRICS_FLUSH_SECONDS прибавляют их к общему файлу
+# SQLite, поэтому METRICS_DB должен быть доступен всем воркерам машины.
+# Включаются в боевом окружении вместе с токеном сборщика: без токена
+# /metrics отвечает 404.
+METRICS_ENABLED = False
+METRICS_DB = os.path.join(tempfile.gettempdir(), 'yatube-metrics.sqlite3')
+METRICS_FLUSH_SECONDS = 5
+METRICS_TOKEN = None
+
+# SQL-запросы дольше порога (мс) с их планами пишутся в файл SQLite;
+# None -- журнал выключен. Отчет: manage.py slowqueries.
+SLOW_QUERY_MS = 100
+SLOW_QUERY_DB = os.path.join(
+    tempfile.gettempdir(), 'yatube-slow-queries.sqlite3')